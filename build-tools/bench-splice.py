@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Benchmark the header splice engines of inject-header.py.
+
+Compares the streaming splice used by ``inject_header_into_file`` against the
+whole-document regex path (``inject_header_into_file_regex``) on the largest
+autodoc pages of a versioned project. Pages are copied to a temporary
+directory first, so the docs tree itself is never modified.
+
+Two scenarios are timed for each engine:
+
+- update: the header alternates between two variants, so every call
+  rewrites the page
+- no-op: the page already carries the header, so nothing is written
+
+Peak Python heap allocation for one update pass is measured separately
+with tracemalloc (which slows execution, so it is not part of the timings).
+
+Usage:
+    python build-tools/bench-splice.py
+    python build-tools/bench-splice.py --docs-root docs --pages 20 --rounds 10
+"""
+
+import argparse
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import hublib
+
+
+def find_largest_pages(docs_root, project, count):
+    """Return the ``count`` largest autodoc pages across all versions."""
+    pages = Path(docs_root).glob(f'{project}/*/autodoc/*.html')
+    return sorted(pages, key=lambda p: p.stat().st_size, reverse=True)[:count]
+
+
+def time_rounds(engine, files, headers, rounds):
+    """
+    Run ``engine`` over ``files`` for ``rounds`` rounds.
+
+    Round i injects ``headers[i % len(headers)]``. Returns the list of
+    per-round wall times in seconds.
+    """
+    times = []
+    for i in range(rounds):
+        header = headers[i % len(headers)]
+        start = time.perf_counter()
+        for f in files:
+            engine(f, header)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def peak_allocation(engine, files, header):
+    """Peak traced heap allocation (bytes) of one pass injecting ``header``."""
+    tracemalloc.start()
+    try:
+        for f in files:
+            engine(f, header)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark streaming vs regex header splicing'
+    )
+    parser.add_argument(
+        '--docs-root',
+        default='docs',
+        help='Path to the docs/ directory (default: docs)'
+    )
+    parser.add_argument(
+        '--project',
+        default='mmif-python',
+        help='Versioned project whose autodoc pages are used (default: mmif-python)'
+    )
+    parser.add_argument(
+        '--pages',
+        type=int,
+        default=20,
+        help='Number of largest pages to benchmark on (default: 20)'
+    )
+    parser.add_argument(
+        '--rounds',
+        type=int,
+        default=10,
+        help='Timed rounds per scenario (default: 10)'
+    )
+    args = parser.parse_args()
+
+    ih = hublib.load_inject_header()
+    pages = find_largest_pages(args.docs_root, args.project, args.pages)
+    if not pages:
+        print(f"Error: No autodoc pages found under "
+              f"{args.docs_root}/{args.project}/*/autodoc/", file=sys.stderr)
+        sys.exit(1)
+
+    total_bytes = sum(p.stat().st_size for p in pages)
+    print(f"Benchmarking {len(pages)} pages ({total_bytes / 1024:.0f} KiB, "
+          f"largest {pages[0].stat().st_size / 1024:.0f} KiB), "
+          f"{args.rounds} rounds")
+
+    projects = ih.discover_projects(args.docs_root)
+    versions = ih.discover_versions(Path(args.docs_root) / args.project)
+    headers = [
+        ih.generate_header(args.project, versions[0], versions, projects,
+                           base_url, is_versioned=True)
+        for base_url in (ih.DEFAULT_BASE_URL, 'http://localhost:8000')
+    ]
+
+    engines = {
+        'regex': ih.inject_header_into_file_regex,
+        'stream': ih.inject_header_into_file,
+    }
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, engine in engines.items():
+            work_dir = Path(tmp) / name
+            work_dir.mkdir()
+            files = []
+            for i, page in enumerate(pages):
+                target = work_dir / f'{i}-{page.name}'
+                shutil.copyfile(page, target)
+                files.append(target)
+
+            # warm up: bring every copy to headers[0] and into the page cache
+            time_rounds(engine, files, headers[:1], 1)
+            update = time_rounds(engine, files, headers[::-1], args.rounds)
+            # an odd number of update rounds leaves headers[1] in place
+            time_rounds(engine, files, headers[:1], 1)
+            noop = time_rounds(engine, files, headers[:1], args.rounds)
+            peak = peak_allocation(engine, files, headers[1])
+            results[name] = (update, noop, peak)
+
+    print(f"\n{'engine':<8} {'update ms/page':>15} {'no-op ms/page':>15} "
+          f"{'peak alloc KiB':>15}")
+    for name, (update, noop, peak) in results.items():
+        print(f"{name:<8} "
+              f"{statistics.median(update) * 1000 / len(pages):>15.3f} "
+              f"{statistics.median(noop) * 1000 / len(pages):>15.3f} "
+              f"{peak / 1024:>15.0f}")
+
+    regex_update, regex_noop, _ = results['regex']
+    stream_update, stream_noop, _ = results['stream']
+    print(f"\nSpeed-up (median): update "
+          f"{statistics.median(regex_update) / statistics.median(stream_update):.1f}x, "
+          f"no-op {statistics.median(regex_noop) / statistics.median(stream_noop):.1f}x")
+
+
+if __name__ == '__main__':
+    main()
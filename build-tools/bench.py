@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Benchmark the hub build pipeline on a synthetic docs tree.
+
+Builds a throwaway docs/ tree of configurable size (N projects, M versions
+per project, K pages per version) and times the stages of inject-header.py
+and home.py on it:
+
+- discover_projects and discover_versions
+- header generation for every (project, version)
+- process_version_directory over every version, first on fresh pages
+  (every file injected) and then again on injected pages (no-op pass)
+- build_injection_plan and execute_plan over a second, fresh copy of the
+  tree with a pool of worker processes, as ``inject-header.py --all`` runs
+  in CI: a fresh pass, then a no-op pass skipped through the manifest
+- home.py's sync_build_output, copying one version's pages into an empty
+  output directory
+
+The memoized discovery and header rendering caches of inject-header.py are
+cleared before each stage, so every stage is timed cold.
+
+For each stage the wall time, files per second, bytes read and written (from
+/proc/self/io where available) and the peak RSS of the process so far are
+recorded. I/O and memory of pool workers are not included. Results are appended as one JSON line per run to the results file,
+so runs across commits can be compared.
+
+Usage:
+    python build-tools/bench.py
+    python build-tools/bench.py --projects 4 --versions 30 --pages 20 \\
+        --jobs 4 --output bench-results.jsonl
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import hublib
+
+# home.py is a sibling script with an importable name
+import home
+
+
+PAGE_HEAD = '''<!doctype html>
+<html class="no-js" lang="en" data-content_root="../">
+  <head><meta charset="utf-8">
+    <meta name="viewport" content="width=device-width,initial-scale=1">
+    <title>{title}</title>
+    <link rel="stylesheet" type="text/css" href="../_static/pygments.css?v=d111a655" />
+    <link rel="stylesheet" type="text/css" href="../_static/styles/furo.css?v=580074bf" />
+{filler_head}</head>
+  <body>
+    <div class="page"><article role="main">
+'''
+
+PAGE_TAIL = '''    </article></div>
+    <script src="../_static/documentation_options.js?v=8a448e45"></script>
+    <script src="../_static/scripts/furo.js?v=46bd48cc"></script>
+  </body>
+</html>
+'''
+
+PARAGRAPH = (
+    '<p>The <code class="docutils literal notranslate"><span class="pre">'
+    'Mmif</span></code> object holds views and documents; see '
+    '<a class="reference internal" href="#section-{n}">section {n}</a>.</p>\n'
+)
+
+
+def make_page(title, size):
+    """Render a synthetic Sphinx/Furo-like page of roughly ``size`` bytes."""
+    head = PAGE_HEAD.format(
+        title=title,
+        filler_head='    <style>body { --color-code-background: #f2f2f2; }</style>\n' * 20,
+    )
+    body = []
+    length = len(head) + len(PAGE_TAIL)
+    n = 0
+    while length < size:
+        paragraph = PARAGRAPH.format(n=n)
+        body.append(paragraph)
+        length += len(paragraph)
+        n += 1
+    return head + ''.join(body) + PAGE_TAIL
+
+
+def build_synthetic_tree(root, projects, versions, pages, page_size):
+    """
+    Create docs/ under root with the requested shape.
+
+    The first project is named 'home'; the others 'project-<i>'. With
+    versions > 0, every project except home gets that many version
+    directories (1.0.0, 1.0.1, ...); otherwise all projects are flat.
+
+    Returns:
+        Tuple of (docs_root, versioned_project_names, total_files, total_bytes)
+    """
+    docs_root = Path(root) / 'docs'
+    names = ['home'] + [f'project-{i}' for i in range(1, projects)]
+    versioned = set(names[1:]) if versions else set()
+    total_files = 0
+    total_bytes = 0
+    for name in names:
+        if name in versioned:
+            site_dirs = [docs_root / name / f'1.0.{v}' for v in range(versions)]
+        else:
+            site_dirs = [docs_root / name]
+        for site_dir in site_dirs:
+            (site_dir / 'autodoc').mkdir(parents=True)
+            for p in range(pages):
+                page = make_page(f'{name} page {p}', page_size)
+                target = site_dir / ('index.html' if p == 0 else f'autodoc/page-{p}.html')
+                target.write_text(page)
+                total_files += 1
+                total_bytes += len(page)
+    return docs_root, versioned, total_files, total_bytes
+
+
+def read_io_counters():
+    """Return (bytes_read, bytes_written) of this process, or None."""
+    try:
+        counters = dict(
+            line.split(': ') for line in Path('/proc/self/io').read_text().splitlines()
+        )
+        return int(counters['rchar']), int(counters['wchar'])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def measure(name, func, files=0):
+    """
+    Run func() and record its wall time and I/O.
+
+    Returns:
+        Tuple of (func's return value, stats dict)
+    """
+    io_before = read_io_counters()
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    io_after = read_io_counters()
+
+    stats = {
+        'seconds': round(seconds, 6),
+        'files': files,
+        'files_per_second': round(files / seconds, 1) if files and seconds else None,
+        'bytes_read': io_after[0] - io_before[0] if io_before else None,
+        'bytes_written': io_after[1] - io_before[1] if io_before else None,
+        'peak_rss_bytes': peak_rss_bytes(),
+    }
+    rate = f", {stats['files_per_second']:.0f} files/s" if stats['files_per_second'] else ''
+    print(f"  {name}: {seconds:.3f}s{rate}")
+    return result, stats
+
+
+def clear_caches(ih):
+    """Empty inject-header.py's memoized discovery and rendering caches."""
+    for cached in (ih._discover_projects, ih._discover_versions,
+                   ih._project_nav_links, ih._render_header,
+                   ih._render_header_bytes):
+        cached.cache_clear()
+
+
+def git_revision():
+    """Current git commit of the build tools, if available."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=Path(__file__).parent, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(projects, versions, pages, page_size, jobs):
+    """Build a synthetic tree, time every stage, and return the results dict."""
+    ih = hublib.load_inject_header()
+    stages = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Building synthetic tree: {projects} projects, {versions} versions, "
+              f"{pages} pages of ~{page_size} bytes...")
+        docs_root, versioned, total_files, total_bytes = build_synthetic_tree(
+            tmp, projects, versions, pages, page_size
+        )
+        print(f"  {total_files} files, {hublib.format_bytes(total_bytes)}")
+        ih.VERSIONED_PROJECTS = versioned
+
+        clear_caches(ih)
+        found, stages['discover_projects'] = measure(
+            'discover_projects', lambda: ih.discover_projects(docs_root)
+        )
+        clear_caches(ih)
+        version_map, stages['discover_versions'] = measure(
+            'discover_versions',
+            lambda: {name: ih.discover_versions(docs_root / name) for name in versioned}
+        )
+
+        def render_headers():
+            headers = []
+            for name in sorted(found):
+                if name in versioned:
+                    for version in version_map[name]:
+                        headers.append((docs_root / name / version, ih.generate_header(
+                            name, version, version_map[name], found,
+                            ih.DEFAULT_BASE_URL, is_versioned=True
+                        )))
+                else:
+                    headers.append((docs_root / name, ih.generate_header(
+                        name, None, [], found, ih.DEFAULT_BASE_URL, is_versioned=False
+                    )))
+            return headers
+
+        clear_caches(ih)
+        headers, stages['generate_header'] = measure('generate_header', render_headers)
+
+        def process_all():
+            for directory, header_html in headers:
+                ih.process_version_directory(directory, header_html)
+
+        _, stages['process_version_directory'] = measure(
+            'process_version_directory (inject)', process_all, total_files
+        )
+        _, stages['process_version_directory_noop'] = measure(
+            'process_version_directory (no-op)', process_all, total_files
+        )
+
+        pool_root, _, pool_files, _ = build_synthetic_tree(
+            Path(tmp) / 'pool', projects, versions, pages, page_size
+        )
+        manifest = {}
+
+        def run_pool():
+            clear_caches(ih)
+            pool_projects = ih.discover_projects(pool_root)
+            plan = ih.build_injection_plan(
+                pool_root, pool_projects, ih.DEFAULT_BASE_URL,
+                {name: pool_root / name for name in sorted(pool_projects)}
+            )
+            return ih.execute_plan(plan, manifest, pool_root, jobs)
+
+        _, stages['execute_plan'] = measure(
+            f'execute_plan (inject, {jobs} jobs)', run_pool, pool_files
+        )
+        _, stages['execute_plan_noop'] = measure(
+            f'execute_plan (no-op, {jobs} jobs)', run_pool, pool_files
+        )
+
+        html_dir = headers[-1][0]
+        sync_files = sum(1 for _ in html_dir.rglob('*.html'))
+        out_dir = Path(tmp) / 'sync-out'
+        _, stages['home_sync_build_output'] = measure(
+            'home.sync_build_output',
+            lambda: home.sync_build_output(str(html_dir), str(out_dir),
+                                           str(Path(tmp) / 'synced.json')),
+            sync_files
+        )
+
+    return {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parameters': {
+            'projects': projects,
+            'versions': versions,
+            'pages': pages,
+            'page_size': page_size,
+            'jobs': jobs,
+            'files': total_files,
+            'bytes': total_bytes,
+        },
+        'stages': stages,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark inject-header.py and home.py on a synthetic docs tree'
+    )
+    parser.add_argument('--projects', type=int, default=4,
+                        help='Number of projects, including home (default: 4)')
+    parser.add_argument('--versions', type=int, default=10,
+                        help='Versions per non-home project; 0 for flat projects '
+                             '(default: 10)')
+    parser.add_argument('--pages', type=int, default=20,
+                        help='Pages per version (default: 20)')
+    parser.add_argument('--page-size', type=int, default=50_000,
+                        help='Approximate page size in bytes (default: 50000)')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help='Worker processes for the execute_plan stages '
+                             '(default: number of CPUs)')
+    parser.add_argument('--output', default='bench-results.jsonl',
+                        help='JSON lines file the results are appended to '
+                             '(default: bench-results.jsonl)')
+    args = parser.parse_args()
+
+    if args.projects < 1 or args.pages < 1 or args.jobs < 1:
+        parser.error('--projects, --pages and --jobs must be at least 1')
+
+    results = run_benchmark(args.projects, args.versions, args.pages, args.page_size,
+                            args.jobs)
+    with open(args.output, 'a') as f:
+        f.write(json.dumps(results) + '\n')
+    print(f"\nResults appended to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Check links and anchors across the CLAMS Documentation Hub, offline.
+
+Every file under docs/ is indexed once, and every HTML page is scanned once
+(in parallel) for its ``id`` anchors and its ``href``/``src`` values (plus
+the URLs of the hub header's version selector). Each reference is then
+resolved against the index:
+
+- relative paths, root-relative paths and absolute URLs under ``--base-url``
+  (as written by inject-header.py and intersphinx) must point to an
+  existing file, or to a directory with an index.html
+- ``#fragment`` parts pointing into an HTML page must name an anchor in it
+
+Links to other sites are not fetched; they are only counted.
+
+Usage:
+    python build-tools/check-links.py docs/
+    python build-tools/check-links.py docs/ --base-url https://clams.ai --jobs 4
+"""
+
+import argparse
+import html
+import os
+import posixpath
+import re
+import sys
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from urllib.parse import unquote
+
+import hublib
+
+
+# Anchors (id) and references (href/src) in one pass; a leading space is
+# much faster to scan for than a word boundary
+ATTRIBUTE_PATTERN = re.compile(r'\s(href|src|id)="([^"]*)"')
+NAME_ANCHOR_PATTERN = re.compile(r'<a\s[^>]*\bname="([^"]*)"')
+
+# Version selector entries of the hub header
+OPTION_URL_PATTERN = re.compile(r'<option value="([^"]+)"')
+
+# Number of pages handed to a worker process at a time
+BATCH_SIZE = 64
+
+
+def index_files(docs_root):
+    """Return the set of every file under docs_root, as relative POSIX paths."""
+    files = set()
+    for dirpath, dirnames, filenames in os.walk(docs_root):
+        dirnames[:] = [d for d in dirnames if d != '.git']
+        rel_dir = Path(dirpath).relative_to(docs_root).as_posix()
+        prefix = '' if rel_dir == '.' else rel_dir + '/'
+        files.update(prefix + filename for filename in filenames)
+    return files
+
+
+def scan_pages(paths, docs_root, base_url):
+    """
+    Read a batch of HTML pages and extract their anchors and references.
+
+    Returns:
+        List of (page, anchors, references) tuples, where page is the path
+        relative to docs_root, anchors a list of ids and references a list
+        of (url, target, fragment) tuples (see resolve_reference)
+    """
+    results = []
+    for path in paths:
+        text = Path(path).read_text(encoding='utf-8', errors='replace')
+        page = Path(path).relative_to(docs_root).as_posix()
+        anchors = NAME_ANCHOR_PATTERN.findall(text)
+        urls = []
+        for attribute, value in ATTRIBUTE_PATTERN.findall(text):
+            if attribute == 'id':
+                anchors.append(value)
+            else:
+                urls.append(value)
+        urls += OPTION_URL_PATTERN.findall(text)
+        references = []
+        for url in urls:
+            url = html.unescape(url)
+            references.append((url, *resolve_reference(page, url, base_url)))
+        results.append((page, anchors, references))
+    return results
+
+
+def resolve_reference(page, url, base_url):
+    """
+    Resolve a reference to the path under the docs root it points to.
+
+    Args:
+        page: Path of the referencing page, relative to the docs root
+        url: The reference (unescaped href/src value)
+        base_url: Base URL the hub is served from
+
+    Returns:
+        Tuple of (target, fragment). target is a POSIX path relative to the
+        docs root (ending in '/' for directory URLs), '..' for paths leading
+        outside the docs root, or None for URLs pointing outside the hub
+        (external sites, mailto:, data:, ...). A fragment-only URL targets
+        the page itself; fragment is None when the URL has none.
+    """
+    path, suffix = hublib.split_url(url)
+    fragment = unquote(suffix.partition('#')[2]) if '#' in suffix else None
+
+    if not path:
+        return (page if url.startswith('#') else None), fragment
+    base_url = base_url.rstrip('/')
+    if path == base_url or path.startswith(base_url + '/'):
+        local = path[len(base_url):]
+    elif path.startswith('//') or hublib.URL_SCHEME_PATTERN.match(path):
+        return None, None
+    elif path.startswith('/'):
+        local = path
+    else:
+        local = posixpath.join(posixpath.dirname(page), path)
+
+    target = posixpath.normpath(unquote(local).lstrip('/'))
+    if target == '..' or target.startswith('../'):
+        return '..', fragment
+    if target == '.':
+        return '', fragment
+    if path.endswith('/'):
+        target += '/'
+    return target, fragment
+
+
+def find_target(rel, files):
+    """The indexed file a resolved reference serves, or None if missing."""
+    if rel.endswith('/') or rel == '':
+        candidate = rel + 'index.html'
+        return candidate if candidate in files else None
+    if rel in files:
+        return rel
+    # directory links without a trailing slash are redirected by the server
+    candidate = rel + '/index.html'
+    return candidate if candidate in files else None
+
+
+def check_links(docs_root, base_url, jobs):
+    """
+    Check every reference of every HTML page under docs_root.
+
+    Returns:
+        Tuple of (broken, counts): broken is a list of (source, url, reason)
+        tuples; counts maps 'pages', 'internal' and 'external' to totals
+    """
+    files = index_files(docs_root)
+    pages = sorted(str(Path(docs_root) / f) for f in files if f.endswith('.html'))
+    batches = [pages[i:i + BATCH_SIZE] for i in range(0, len(pages), BATCH_SIZE)]
+    args = (batches, [docs_root] * len(batches), [base_url] * len(batches))
+    if jobs > 1 and len(batches) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            scanned = [r for batch in pool.map(scan_pages, *args) for r in batch]
+    else:
+        scanned = [r for batch in map(scan_pages, *args) for r in batch]
+
+    anchors = {page: set(ids) for page, ids, _ in scanned}
+
+    broken = []
+    counts = {'pages': len(scanned), 'internal': 0, 'external': 0}
+    for page, _, references in scanned:
+        for url, target, fragment in references:
+            if target is None:
+                counts['external'] += 1
+                continue
+            counts['internal'] += 1
+            if target == '..':
+                broken.append((page, url, 'points outside the docs root'))
+                continue
+            found = find_target(target, files)
+            if found is None:
+                broken.append((page, url, 'missing file'))
+            elif fragment and found in anchors and fragment not in anchors[found]:
+                broken.append((page, url, f'missing anchor #{fragment}'))
+    return broken, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Check links and anchors across the documentation hub offline'
+    )
+    parser.add_argument(
+        'docs_root',
+        help='Path to the docs/ directory'
+    )
+    parser.add_argument(
+        '--base-url',
+        default='https://clams.ai',
+        help='Base URL the hub is served from; absolute links under it are '
+             'checked locally (default: https://clams.ai)'
+    )
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=os.cpu_count() or 1,
+        help='Number of worker processes (default: number of CPUs)'
+    )
+    args = parser.parse_args()
+
+    docs_root = Path(args.docs_root)
+    if not docs_root.is_dir():
+        print(f"Error: Directory not found: {docs_root}", file=sys.stderr)
+        sys.exit(1)
+
+    broken, counts = check_links(docs_root, args.base_url, max(1, args.jobs))
+
+    by_project = defaultdict(list)
+    for source, url, reason in broken:
+        by_project[source.split('/')[0]].append((source, url, reason))
+    for project in sorted(by_project):
+        print(f"{project}: {len(by_project[project])} broken links")
+        for source, url, reason in by_project[project]:
+            print(f"  {source}: {url} ({reason})")
+
+    print(f"\nComplete: {counts['pages']} pages, {counts['internal']} internal links "
+          f"checked, {len(broken)} broken; {counts['external']} external links skipped")
+    if broken:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
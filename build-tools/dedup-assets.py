@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Deduplicate identical Sphinx static assets across the CLAMS Documentation Hub.
+
+Every project and version under docs/ ships its own ``_static/`` tree, and
+most of those files (theme CSS/JS, source maps, icons) are byte-identical
+across versions. This script hashes every asset under ``docs/*/.../_static/``
+and removes the duplication in one of two ways:
+
+``--mode store`` (default)
+    Each duplicated asset is stored once in a content-addressed directory,
+    ``docs/assets/static/<unit-hash>/``, and the ``href``/``src`` attributes
+    of every HTML page that loaded a local copy are rewritten to point there.
+    An asset is stored together with the files it references by relative
+    path (``url(...)`` in CSS, ``sourceMappingURL`` comments), keeping their
+    relative layout, so those references keep working; the unit hash covers
+    all of them. Assets referencing anything outside their ``_static/`` tree
+    are left alone. Local copies are deleted once nothing left in place
+    needs them. This shrinks the published tree, and browsers get cache hits
+    across versions.
+
+``--mode hardlink``
+    Identical files are hardlinked to a single copy and no page is changed.
+    This only saves space on the local disk (e.g. a CI runner); git and
+    GitHub Pages still see separate files.
+
+Usage:
+    python build-tools/dedup-assets.py docs/
+    python build-tools/dedup-assets.py docs/ --dry-run
+    python build-tools/dedup-assets.py docs/ --mode hardlink
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+import hublib
+
+
+# Content-addressed asset store, relative to the docs root
+STORE_DIR = 'assets/static'
+
+# Length of the unit hash used as store directory name
+UNIT_HASH_LENGTH = 16
+
+def collect_assets(docs_root):
+    """
+    Find and hash every file inside a ``_static`` directory of a project.
+
+    Returns:
+        Dict mapping asset Paths to ``{'digest': ..., 'size': ...}``
+    """
+    assets = {}
+    for path in hublib.iter_project_files(docs_root):
+        if '_static' not in path.relative_to(docs_root).parts:
+            continue
+        assets[path] = {
+            'digest': hublib.file_digest(path),
+            'size': path.stat().st_size,
+        }
+    return assets
+
+
+def build_units(assets):
+    """
+    Group each asset with the files it (transitively) references.
+
+    An asset whose references leave its ``_static`` tree, or point to
+    missing files, cannot be moved and gets no unit.
+
+    Returns:
+        Dict mapping asset Paths to sorted lists of member Paths (the asset
+        included), for movable assets only
+    """
+    dependencies = {}
+    pinned = set()
+    for path in assets:
+        deps = []
+        root = hublib.static_root(path)
+        for url in hublib.asset_references(path):
+            target = hublib.resolve_local_reference(path, url)
+            if target not in assets or root not in target.parents:
+                pinned.add(path)
+                break
+            deps.append(target)
+        dependencies[path] = deps
+
+    units = {}
+    for path in assets:
+        members = set()
+        stack = [path]
+        while stack:
+            current = stack.pop()
+            if current in members:
+                continue
+            members.add(current)
+            stack.extend(dependencies[current])
+        if not members & pinned:
+            units[path] = sorted(members)
+    return units
+
+
+def unit_hash(members, assets):
+    """Hash of a unit: its members' paths within _static and digests."""
+    root = hublib.static_root(members[0])
+    lines = ''.join(
+        f"{member.relative_to(root).as_posix()} {assets[member]['digest']}\n"
+        for member in members
+    )
+    return hashlib.sha256(lines.encode('utf-8')).hexdigest()[:UNIT_HASH_LENGTH]
+
+
+def remove_empty_dirs(paths, docs_root):
+    """Remove directories left empty by deletions, up to the project level."""
+    docs_root = Path(docs_root)
+    for directory in sorted({p.parent for p in paths}, key=lambda d: -len(d.parts)):
+        while directory != docs_root and directory.parent != docs_root:
+            try:
+                directory.rmdir()
+            except OSError:
+                break
+            directory = directory.parent
+
+
+def dedup_store(docs_root, assets, base_url, dry_run=False):
+    """
+    Move duplicated assets into the content-addressed store.
+
+    Returns:
+        Dict mapping project names to ``{'removed': bytes, 'files': count}``,
+        and the number of bytes added to the store
+    """
+    ih = hublib.load_inject_header()
+    docs_root = Path(docs_root)
+    store_root = docs_root / STORE_DIR
+
+    units = build_units(assets)
+    ref_counts, pages, absolute = hublib.scan_page_references(docs_root, assets,
+                                                                 base_url)
+
+    # Movable assets loaded by pages are candidates; move those whose unit
+    # occurs more than once or is already stored
+    unit_of = {
+        path: unit_hash(units[path], assets)
+        for path in ref_counts if path in units
+    }
+    occurrences = defaultdict(int)
+    for uid in unit_of.values():
+        occurrences[uid] += 1
+    moved = {
+        path: uid for path, uid in unit_of.items()
+        if occurrences[uid] > 1 or (store_root / uid).is_dir()
+    }
+
+    # Store location of every member of every moved unit
+    store_paths = {}
+    blobs = {}
+    for path, uid in moved.items():
+        root = hublib.static_root(path)
+        for member in units[path]:
+            target = store_root / uid / member.relative_to(root)
+            blobs[target] = member
+            if member == path:
+                store_paths[path] = target
+
+    # Local files still needed by assets staying in place
+    keep = set(absolute)
+    for path in ref_counts:
+        if path not in moved:
+            keep.update(units.get(path, [path]))
+    delete = {
+        member for path in moved for member in units[path]
+    } - keep
+
+    added = 0
+    for target, source in sorted(blobs.items()):
+        if target.exists():
+            continue
+        added += assets[source]['size']
+        if not dry_run:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            ih.write_file_atomically(target, source.read_bytes())
+
+    rewritten = 0
+    if not dry_run:
+        for html_path in pages:
+            rewritten += hublib.rewrite_page_references(html_path, store_paths)
+
+    report = defaultdict(lambda: {'removed': 0, 'files': 0})
+    for path in sorted(delete):
+        project = hublib.project_of(path, docs_root)
+        report[project]['removed'] += assets[path]['size']
+        report[project]['files'] += 1
+        if not dry_run:
+            path.unlink()
+    if not dry_run:
+        remove_empty_dirs(delete, docs_root)
+
+    print(f"{len(moved)} assets ({len(set(moved.values()))} distinct units) "
+          f"served from {store_root}"
+          + (f", {rewritten} attributes rewritten" if not dry_run else ''))
+    return report, added
+
+
+def dedup_hardlink(docs_root, assets, dry_run=False):
+    """
+    Hardlink identical assets to one copy.
+
+    Returns:
+        Dict mapping project names to ``{'removed': bytes, 'files': count}``,
+        and 0 (nothing is added)
+    """
+    groups = defaultdict(list)
+    for path, info in assets.items():
+        groups[info['digest']].append(path)
+
+    report = defaultdict(lambda: {'removed': 0, 'files': 0})
+    for paths in groups.values():
+        if len(paths) < 2:
+            continue
+        paths.sort()
+        canonical = paths[0]
+        canonical_stat = canonical.stat()
+        for path in paths[1:]:
+            path_stat = path.stat()
+            if (path_stat.st_dev, path_stat.st_ino) == \
+                    (canonical_stat.st_dev, canonical_stat.st_ino):
+                continue
+            if not dry_run:
+                tmp_path = path.with_name(f'.{path.name}.link')
+                os.link(canonical, tmp_path)
+                os.replace(tmp_path, path)
+            project = hublib.project_of(path, docs_root)
+            report[project]['removed'] += assets[path]['size']
+            report[project]['files'] += 1
+    return report, 0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Deduplicate identical static assets across docs projects and versions'
+    )
+    parser.add_argument(
+        'docs_root',
+        help='Path to the docs/ directory'
+    )
+    parser.add_argument(
+        '--mode',
+        choices=('store', 'hardlink'),
+        default='store',
+        help='store: move duplicates to a shared content-addressed directory '
+             'and rewrite pages; hardlink: link identical files on disk '
+             '(default: store)'
+    )
+    parser.add_argument(
+        '--base-url',
+        default='https://clams.ai',
+        help='Base URL of the hub; assets referenced by absolute URLs under it '
+             'are never removed (default: https://clams.ai)'
+    )
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Show what would be done without making changes'
+    )
+    args = parser.parse_args()
+
+    docs_root = Path(args.docs_root)
+    if not docs_root.is_dir():
+        print(f"Error: Directory not found: {docs_root}", file=sys.stderr)
+        sys.exit(1)
+
+    assets = collect_assets(docs_root)
+    total = sum(info['size'] for info in assets.values())
+    unique = sum(
+        {info['digest']: info['size'] for info in assets.values()}.values()
+    )
+    print(f"Found {len(assets)} assets ({hublib.format_bytes(total)}), "
+          f"{hublib.format_bytes(unique)} unique")
+
+    if args.dry_run:
+        print("\nDry run mode - no changes will be made\n")
+
+    if args.mode == 'store':
+        report, added = dedup_store(docs_root, assets, args.base_url,
+                                    args.dry_run)
+    else:
+        report, added = dedup_hardlink(docs_root, assets, args.dry_run)
+
+    removed = 0
+    for project in sorted(report):
+        stats = report[project]
+        print(f"  {project}: {stats['files']} files, "
+              f"{hublib.format_bytes(stats['removed'])} deduplicated")
+        removed += stats['removed']
+
+    verb = 'Would save' if args.dry_run else 'Saved'
+    print(f"\nComplete: {verb} {hublib.format_bytes(removed - added)} "
+          f"({hublib.format_bytes(removed)} deduplicated, "
+          f"{hublib.format_bytes(added)} added to the shared store)")
+
+
+if __name__ == '__main__':
+    main()
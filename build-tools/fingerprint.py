@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Give static assets content-hashed names, and optionally write cache rules.
+
+Sphinx writes assets under ``_static/`` with stable names (``furo.js``,
+``pygments.css``), so a front end cannot cache them for long without
+serving stale files after a release. This script renames every asset that
+HTML pages load through ``href``/``src`` to ``<stem>.<hash><suffix>`` (the
+naming inject-header.py already uses for the header stylesheet) and
+rewrites the pages. Browsers then always fetch the current version of a
+changed asset, whatever cache lifetime the host gives it.
+
+With ``--headers``, it also writes ``docs/_headers`` with:
+
+- immutable caching for every fingerprinted asset and for the
+  content-addressed store of dedup-assets.py (``docs/assets/static/``)
+- short caching for HTML pages
+
+Only hosts and CDNs that read this Netlify / Cloudflare Pages format apply
+it. GitHub Pages, which serves the hub, ignores it and would publish the
+file as a plain asset. As Sphinx already adds ``?v=`` cache-busting query
+strings to the assets it links, the publish workflow does not run this
+script; it is meant for hosts that read ``_headers``.
+
+Like dedup-assets.py, an asset is handled together with the files it
+references by relative path (``url(...)`` in CSS, ``sourceMappingURL``
+comments): those are fingerprinted first and the references rewritten, so
+the hash of a stylesheet covers the names of the fonts and images it loads.
+An asset keeps its name when
+
+- its name already carries a hash,
+- a script of its ``_static/`` tree names it (e.g. ``doctools.js`` loads
+  ``minus.png`` by name), or a page loads it through an absolute hub URL,
+- it is the hub header's logo or its WebP variant (see inject-header.py),
+- or a file keeping its name (including one no page loads) references it.
+
+Runs are idempotent: fingerprinted names are left alone, and the same
+content gets the same name again when a fresh build is synced in.
+
+Usage:
+    python build-tools/fingerprint.py docs/ --dry-run
+    python build-tools/fingerprint.py docs/
+    python build-tools/fingerprint.py docs/ --headers
+"""
+
+import argparse
+import hashlib
+import re
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+import hublib
+
+
+# Length of the content hash put into file names
+HASH_LENGTH = 10
+
+# Names that already carry a content hash, e.g. clams-hub-header.0123abcd45.css
+HASHED_NAME_PATTERN = re.compile(r'\.[0-9a-f]{8,}\.[^./]+$')
+
+# Rules file, relative to the docs root (Netlify / Cloudflare Pages format)
+HEADERS_FILENAME = '_headers'
+
+# Content-addressed store of dedup-assets.py, relative to the docs root
+STORE_DIR = 'assets/static'
+
+HTML_CACHE_CONTROL = 'public, max-age=300, must-revalidate'
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Precompressed siblings (see precompress.py), stale once their source moves
+PRECOMPRESSED_SUFFIXES = ('.gz', '.br')
+
+
+def is_fingerprinted(path):
+    """Whether a file name already carries a content hash."""
+    return HASHED_NAME_PATTERN.search(path.name) is not None
+
+
+def fingerprinted_name(path, data):
+    """The content-hashed name of path with contents data."""
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    return f'{path.stem}.{digest}{path.suffix}'
+
+
+def collect_assets(docs_root):
+    """Return the set of every file inside a ``_static`` directory of a project."""
+    return {
+        path for path in hublib.iter_project_files(docs_root)
+        if '_static' in path.relative_to(docs_root).parts
+    }
+
+
+def asset_dependencies(assets):
+    """Map every asset to the assets it references by relative path."""
+    dependencies = {}
+    for path in assets:
+        targets = (hublib.resolve_local_reference(path, url)
+                   for url in hublib.asset_references(path))
+        dependencies[path] = sorted({t for t in targets if t in assets})
+    return dependencies
+
+
+def closure(paths, dependencies):
+    """paths and every asset they (transitively) reference."""
+    result = set()
+    stack = list(paths)
+    while stack:
+        current = stack.pop()
+        if current not in result:
+            result.add(current)
+            stack.extend(dependencies[current])
+    return result
+
+
+def plan_renames(assets, loaded, fixed, dependencies):
+    """
+    Choose the assets to fingerprint, in the order to process them.
+
+    Args:
+        assets: Set of every asset
+        loaded: Assets loaded by pages
+        fixed: Assets that must keep their names
+        dependencies: As from asset_dependencies
+
+    Returns:
+        List of asset Paths, each after the assets it references
+    """
+    reachable = closure(loaded, dependencies)
+    fixed = set(fixed) | {p for p in assets if is_fingerprinted(p)}
+    fixed |= assets - reachable
+    while True:
+        kept = closure(fixed, dependencies)
+        order, state, cyclic = [], {}, None
+
+        def visit(path):
+            nonlocal cyclic
+            state[path] = 'visiting'
+            for dep in dependencies[path]:
+                if dep in kept or state.get(dep) == 'done':
+                    continue
+                if state.get(dep) == 'visiting':
+                    cyclic = dep
+                    return
+                visit(dep)
+                if cyclic:
+                    return
+            state[path] = 'done'
+            order.append(path)
+
+        for path in sorted(reachable - kept):
+            if path not in state:
+                visit(path)
+            if cyclic:
+                break
+        if cyclic is None:
+            return order
+        # files referencing each other cannot both embed the other's hash
+        fixed.add(cyclic)
+
+
+def rewrite_references(path, data, renames):
+    """
+    Point an asset's relative references at fingerprinted names.
+
+    Returns:
+        The new contents (bytes)
+    """
+    if path.suffix not in ('.css', '.js'):
+        return data
+    text = data.decode('utf-8')
+    parts = []
+    last = 0
+    for start, end in hublib.asset_reference_spans(text, path.suffix):
+        url = text[start:end]
+        target = hublib.resolve_local_reference(path, url)
+        if target in renames:
+            _, suffix = hublib.split_url(url)
+            parts.append(text[last:start])
+            parts.append(hublib.relative_url(path, renames[target]) + suffix)
+            last = end
+    if not parts:
+        return data
+    parts.append(text[last:])
+    return ''.join(parts).encode('utf-8')
+
+
+def fingerprint_assets(order, renames, dry_run, atomic_write):
+    """
+    Write each planned asset under its fingerprinted name.
+
+    Args:
+        order: Assets to fingerprint, as from plan_renames
+        renames: Dict filled with the new Path of each asset
+        dry_run: Compute names without touching files
+        atomic_write: Function (path, bytes) replacing a file atomically
+
+    Returns:
+        Dict mapping asset Paths to the size of their new contents
+    """
+    sizes = {}
+    for path in order:
+        data = rewrite_references(path, path.read_bytes(), renames)
+        target = path.with_name(fingerprinted_name(path, data))
+        renames[path] = target
+        sizes[path] = len(data)
+        if dry_run:
+            continue
+        if not target.exists():
+            atomic_write(target, data)
+        path.unlink()
+        for suffix in PRECOMPRESSED_SUFFIXES:
+            path.with_name(path.name + suffix).unlink(missing_ok=True)
+    return sizes
+
+
+def build_headers(docs_root):
+    """
+    Build the cache rules for the whole docs tree.
+
+    Rules never overlap, as hosts merge the headers of every matching rule.
+
+    Returns:
+        Contents of the _headers file (str) and the number of immutable files
+    """
+    docs_root = Path(docs_root)
+    html_dirs = set()
+    for index in docs_root.rglob('index.html'):
+        rel = index.parent.relative_to(docs_root).as_posix()
+        html_dirs.add('/' if rel == '.' else f'/{rel}/')
+    hashed = sorted(
+        '/' + p.relative_to(docs_root).as_posix()
+        for p in collect_assets(docs_root) if is_fingerprinted(p)
+    )
+
+    lines = ['# Generated by build-tools/fingerprint.py; do not edit', '']
+    for pattern in ['/*.html'] + sorted(html_dirs):
+        lines += [pattern, f'  Cache-Control: {HTML_CACHE_CONTROL}']
+    for pattern in [f'/{STORE_DIR}/*'] + hashed:
+        lines += [pattern, f'  Cache-Control: {IMMUTABLE_CACHE_CONTROL}']
+    return '\n'.join(lines) + '\n', len(hashed)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Give static assets content-hashed names, and optionally write cache rules'
+    )
+    parser.add_argument(
+        'docs_root',
+        help='Path to the docs/ directory'
+    )
+    parser.add_argument(
+        '--base-url',
+        default='https://clams.ai',
+        help='Base URL of the hub; assets referenced by absolute URLs under it '
+             'keep their names (default: https://clams.ai)'
+    )
+    parser.add_argument(
+        '--headers',
+        action='store_true',
+        help=f'Also write cache rules to {HEADERS_FILENAME} in the docs root '
+             '(only for hosts that read that format; GitHub Pages does not)'
+    )
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Show what would be done without making changes'
+    )
+    args = parser.parse_args()
+
+    docs_root = Path(args.docs_root)
+    if not docs_root.is_dir():
+        print(f"Error: Directory not found: {docs_root}", file=sys.stderr)
+        sys.exit(1)
+
+    ih = hublib.load_inject_header()
+    assets = collect_assets(docs_root)
+    counts, pages, absolute = hublib.scan_page_references(docs_root, assets,
+                                                          args.base_url)
+    loaded = set(counts)
+    dependencies = asset_dependencies(assets)
+    header_logos = {docs_root / ih.HEADER_LOGO_PATH,
+                    docs_root / ih.header_logo_path(docs_root)}
+    order = plan_renames(assets, loaded,
+                         absolute | hublib.named_in_scripts(assets) | header_logos,
+                         dependencies)
+    print(f"Found {len(assets)} assets, {len(loaded)} loaded by pages, "
+          f"{len(order)} to fingerprint")
+
+    if args.dry_run:
+        print("\nDry run mode - no changes will be made\n")
+
+    renames = {}
+    sizes = fingerprint_assets(order, renames, args.dry_run,
+                               ih.write_file_atomically)
+    rewritten = 0
+    if not args.dry_run:
+        for html_path in pages:
+            rewritten += hublib.rewrite_page_references(html_path, renames)
+
+    report = defaultdict(lambda: {'files': 0, 'bytes': 0})
+    for path, size in sizes.items():
+        stats = report[hublib.project_of(path, docs_root)]
+        stats['files'] += 1
+        stats['bytes'] += size
+    for project in sorted(report):
+        print(f"  {project}: {report[project]['files']} assets "
+              f"({hublib.format_bytes(report[project]['bytes'])}) fingerprinted")
+
+    if args.dry_run:
+        print(f"\nComplete: would fingerprint {len(order)} assets")
+        return
+    summary = (f"\nComplete: {len(order)} assets fingerprinted, {rewritten} "
+               f"attributes rewritten")
+    if not args.headers:
+        print(summary)
+        return
+    headers, immutable = build_headers(docs_root)
+    updated = hublib.write_if_changed(docs_root / HEADERS_FILENAME, headers)
+    print(f"{summary}; {immutable} files cached as immutable in "
+          f"{docs_root / HEADERS_FILENAME}" + (' (updated)' if updated else ''))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,40 +1,378 @@
-import subprocess
+import argparse
+import fnmatch
+import functools
+import hashlib
+import http.server
+import json
 import os
 import shutil
+import subprocess
+import threading
+import time
+
+import hublib
+
+SOURCE_DIR = "documentation"
+OUTPUT_DIR = "docs/home"
+
+# Persistent Sphinx build directory, outside the published tree. Keeping the
+# doctrees/environment pickle here lets Sphinx rebuild only changed sources.
+BUILD_DIR = "_build/home"
+
+# Record of the build outputs last synced into OUTPUT_DIR (relative path ->
+# sha256), so unchanged outputs are not copied again
+SYNC_STATE_FILE = "synced.json"
+
+# Files in OUTPUT_DIR that are not produced by Sphinx and must survive a sync
+# (the shared header stylesheet written by inject-header.py --external-css)
+PRESERVED_OUTPUTS = ["_static/clams-hub-header.*.css"]
+
+# Docs root served by --watch
+DOCS_ROOT = "docs"
+
+# --watch syncs into this scratch copy of OUTPUT_DIR instead, served in front
+# of DOCS_ROOT, so its local-URL headers never reach the published pages
+WATCH_ROOT = os.path.join(BUILD_DIR, "watch")
+WATCH_OUTPUT_DIR = os.path.join(WATCH_ROOT, "home")
+WATCH_SYNC_STATE_FILE = "watch-synced.json"
+
+# --watch polls the sources this often, and rebuilds once they have been
+# quiet for DEBOUNCE_SECONDS
+POLL_SECONDS = 0.2
+DEBOUNCE_SECONDS = 0.3
+
+# Sphinx status lines marking the start of a build phase. Phases run in
+# this order; everything before the first marker is counted as "setup".
+PHASE_MARKERS = [
+    ("updating environment", "read"),
+    ("reading sources", "read"),
+    ("pickling environment", "resolve"),
+    ("checking consistency", "resolve"),
+    ("preparing documents", "resolve"),
+    ("writing output", "write"),
+    ("generating indices", "write"),
+    ("dumping search index", "write"),
+]
+
+
+def _digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _is_preserved(rel_path):
+    return any(fnmatch.fnmatch(rel_path, pattern) for pattern in PRESERVED_OUTPUTS)
+
+
+def _walk_files(root):
+    """Yield POSIX paths of all files under root, relative to it."""
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            full_path = os.path.join(dirpath, filename)
+            yield os.path.relpath(full_path, root).replace(os.sep, "/")
+
+
+def sync_build_output(html_dir, output_dir, state_path):
+    """
+    Copy changed Sphinx outputs from html_dir into output_dir.
+
+    Outputs are compared with the hashes recorded at the last sync rather
+    than with output_dir itself, because published pages carry the injected
+    hub header. Outputs that disappeared from the build are deleted. On the
+    first sync (no recorded state) output_dir is mirrored exactly, apart
+    from PRESERVED_OUTPUTS.
+
+    Returns:
+        Tuple of (copied, removed, unchanged) lists of relative paths
+    """
+    try:
+        with open(state_path) as f:
+            state = json.load(f)
+    except (FileNotFoundError, ValueError):
+        state = None
+
+    built = sorted(_walk_files(html_dir))
+    new_state = {}
+    copied, unchanged = [], []
+    for rel_path in built:
+        src = os.path.join(html_dir, rel_path)
+        dest = os.path.join(output_dir, rel_path)
+        digest = _digest(src)
+        new_state[rel_path] = digest
+        if state is not None and state.get(rel_path) == digest and os.path.exists(dest):
+            unchanged.append(rel_path)
+            continue
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp_dest = f"{dest}.tmp"
+        shutil.copyfile(src, tmp_dest)
+        os.replace(tmp_dest, dest)
+        copied.append(rel_path)
+
+    if state is None and os.path.isdir(output_dir):
+        stale = set(_walk_files(output_dir)) - set(new_state)
+    else:
+        stale = set(state or {}) - set(new_state)
+    removed = []
+    for rel_path in sorted(stale):
+        if _is_preserved(rel_path):
+            continue
+        dest = os.path.join(output_dir, rel_path)
+        if os.path.exists(dest):
+            os.remove(dest)
+            removed.append(rel_path)
+    # clean up directories emptied by removals
+    for dirpath, _, _ in sorted(os.walk(output_dir), key=lambda d: -len(d[0])):
+        if dirpath != output_dir and not os.listdir(dirpath):
+            os.rmdir(dirpath)
+
+    with open(state_path, "w") as f:
+        json.dump(new_state, f, indent=1, sort_keys=True)
+    return copied, removed, unchanged
+
+
+def run_sphinx(source_dir, html_dir, doctree_dir, jobs):
+    """
+    Run sphinx-build, echoing its output line by line as it runs.
+
+    Returns:
+        Dict mapping phase names (setup, read, resolve, write) to seconds
+    """
+    command = [
+        "sphinx-build", "-b", "html", "-j", str(jobs),
+        "-d", doctree_dir, source_dir, html_dir,
+    ]
+    # keep sphinx from block-buffering its output into the pipe
+    env = dict(os.environ, PYTHONUNBUFFERED="1")
+    timings = {}
+    phase, phase_start = "setup", time.perf_counter()
+
+    # Text mode also splits on the carriage returns of progress lines
+    process = subprocess.Popen(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        env=env
+    )
+    for line in process.stdout:
+        line = line.rstrip("\n")
+        print(line, flush=True)
+        for marker, next_phase in PHASE_MARKERS:
+            if line.startswith(marker) and next_phase != phase:
+                now = time.perf_counter()
+                timings[phase] = timings.get(phase, 0.0) + now - phase_start
+                phase, phase_start = next_phase, now
+                break
+    returncode = process.wait()
+    timings[phase] = timings.get(phase, 0.0) + time.perf_counter() - phase_start
 
-def build_home_docs():
+    if returncode != 0:
+        print("!!! Sphinx build failed !!!")
+        print(f"Return code: {returncode}")
+        exit(1)
+    return timings
+
+
+def build_home_docs(clean=False, jobs=None, output_dir=OUTPUT_DIR,
+                    state_file=SYNC_STATE_FILE):
     """
     Builds the hub home page documentation from the 'documentation' directory.
+
+    By default the build is incremental: Sphinx works in BUILD_DIR, which
+    keeps its environment between runs so only changed sources are re-read
+    and re-written, and only changed outputs are synced into OUTPUT_DIR.
+    With clean=True, the build directory and OUTPUT_DIR are wiped first.
+    Sphinx runs with `jobs` parallel workers (default: number of CPUs) and
+    per-phase timings are printed at the end. output_dir and state_file
+    (in BUILD_DIR) replace OUTPUT_DIR and its sync record.
+
+    Returns:
+        List of output paths (relative to output_dir) that were (re)written
     """
-    source_dir = "documentation"
-    output_dir = "docs/home"
+    source_dir = SOURCE_DIR
+    html_dir = os.path.join(BUILD_DIR, "html")
+    doctree_dir = os.path.join(BUILD_DIR, "doctrees")
+    state_path = os.path.join(BUILD_DIR, state_file)
 
     print(f"--- Building home documentation ---")
     print(f"Source: {source_dir}")
     print(f"Output: {output_dir}")
 
-    # Ensure the output directory exists and is clean
-    if os.path.exists(output_dir):
-        shutil.rmtree(output_dir)
-    os.makedirs(output_dir)
+    if clean:
+        # Start from scratch: no cached environment, no published pages
+        for path in (BUILD_DIR, output_dir):
+            if os.path.exists(path):
+                shutil.rmtree(path)
+    os.makedirs(html_dir, exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
+
+    jobs = jobs or os.cpu_count() or 1
+    timings = run_sphinx(source_dir, html_dir, doctree_dir, jobs)
+
+    sync_start = time.perf_counter()
+    copied, removed, unchanged = sync_build_output(html_dir, output_dir, state_path)
+    timings["sync"] = time.perf_counter() - sync_start
+
+    print(f"Successfully built documentation in {output_dir} "
+          f"({len(copied)} updated, {len(removed)} removed, {len(unchanged)} unchanged)")
+    print("Phase timings: " + ", ".join(
+        f"{phase} {seconds:.2f}s" for phase, seconds in timings.items()
+    ))
+    return copied
+
+
+def inject_home_headers(rel_paths, base_url, output_dir=OUTPUT_DIR):
+    """
+    Inject the hub header into the given HTML outputs (relative to output_dir).
+
+    Returns:
+        Number of files updated
+    """
+    ih = hublib.load_inject_header()
+    projects = ih.discover_projects(DOCS_ROOT)
+    header_html = ih.generate_header(
+        "home", None, [], projects, base_url, is_versioned=False,
+        logo_path=ih.header_logo_path(DOCS_ROOT)
+    )
+    updated = 0
+    for rel_path in rel_paths:
+        if rel_path.endswith(".html"):
+            path = os.path.join(output_dir, rel_path)
+            updated += ih.inject_header_into_file(path, header_html) == ih.UPDATED
+    return updated
+
+
+def snapshot_sources(source_dir):
+    """Map every source file (hidden and editor backup files excluded) to its mtime and size."""
+    snapshot = {}
+    for dirpath, dirnames, filenames in os.walk(source_dir):
+        dirnames[:] = [d for d in dirnames if not d.startswith((".", "_build"))]
+        for filename in filenames:
+            if filename.startswith(".") or filename.endswith("~"):
+                continue
+            path = os.path.join(dirpath, filename)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            snapshot[path] = (st.st_mtime_ns, st.st_size)
+    return snapshot
+
 
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class WatchHandler(QuietHandler):
+    """Serve files of WATCH_ROOT where it has them, and DOCS_ROOT otherwise."""
+
+    def translate_path(self, path):
+        self.directory = WATCH_ROOT
+        translated = super().translate_path(path)
+        if not (os.path.isfile(translated)
+                or os.path.isfile(os.path.join(translated, "index.html"))):
+            self.directory = DOCS_ROOT
+            translated = super().translate_path(path)
+        return translated
+
+
+def serve_docs(port):
+    """Serve DOCS_ROOT, overlaid with WATCH_ROOT, over HTTP from a background thread."""
+    handler = functools.partial(WatchHandler, directory=DOCS_ROOT)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def watch(clean=False, jobs=None, port=8000):
+    """
+    Build, then rebuild whenever the sources change, serving the result.
+
+    Sources are polled every POLL_SECONDS; a rebuild starts once they have
+    been unchanged for DEBOUNCE_SECONDS. Each rebuild is incremental (only
+    changed pages are re-written by Sphinx and synced), and the hub header
+    is injected into just the HTML files that were synced. Pages are synced
+    into WATCH_OUTPUT_DIR, not OUTPUT_DIR, and docs/ is served with them in
+    place of docs/home/ on http://localhost:<port>/, which is also used as
+    the header's base URL. The published pages are left untouched.
+    """
+    base_url = f"http://localhost:{port}"
+
+    def rebuild(clean=False):
+        start = time.perf_counter()
+        try:
+            copied = build_home_docs(clean=clean, jobs=jobs,
+                                     output_dir=WATCH_OUTPUT_DIR,
+                                     state_file=WATCH_SYNC_STATE_FILE)
+        except SystemExit:
+            print("Build failed; waiting for the next change")
+            return
+        updated = inject_home_headers(copied, base_url, WATCH_OUTPUT_DIR)
+        print(f"Injected header into {updated} files; "
+              f"rebuilt in {time.perf_counter() - start:.2f}s")
+
+    rebuild(clean)
+    # pages synced by earlier sessions may carry another port
+    inject_home_headers(list(_walk_files(WATCH_OUTPUT_DIR)), base_url,
+                        WATCH_OUTPUT_DIR)
+    serve_docs(port)
+    print(f"Serving {DOCS_ROOT} on {base_url}/home/ - watching {SOURCE_DIR} "
+          f"(Ctrl+C to stop)")
+
+    snapshot = snapshot_sources(SOURCE_DIR)
     try:
-        # Run the sphinx-build command
-        subprocess.run(
-            ["sphinx-build", "-b", "html", source_dir, output_dir],
-            check=True,
-            capture_output=True,
-            text=True
-        )
-        print(f"Successfully built documentation in {output_dir}")
-    except subprocess.CalledProcessError as e:
-        print("!!! Sphinx build failed !!!")
-        print(f"Return code: {e.returncode}")
-        print("--- STDOUT ---")
-        print(e.stdout)
-        print("--- STDERR ---")
-        print(e.stderr)
-        exit(1)
+        while True:
+            time.sleep(POLL_SECONDS)
+            current = snapshot_sources(SOURCE_DIR)
+            if current == snapshot:
+                continue
+            # debounce: wait until the sources stop changing
+            while True:
+                time.sleep(DEBOUNCE_SECONDS)
+                settled = snapshot_sources(SOURCE_DIR)
+                if settled == current:
+                    break
+                current = settled
+            changed = sorted(
+                path for path in set(snapshot) | set(current)
+                if snapshot.get(path) != current.get(path)
+            )
+            print(f"\nChanged: {', '.join(changed)}")
+            snapshot = current
+            rebuild()
+    except KeyboardInterrupt:
+        print("\nStopped watching")
+
 
 if __name__ == "__main__":
-    build_home_docs()
+    parser = argparse.ArgumentParser(description="Build the hub home documentation")
+    parser.add_argument(
+        "--clean",
+        action="store_true",
+        help=f"Discard the cached Sphinx environment in {BUILD_DIR} and "
+             f"rebuild {OUTPUT_DIR} from scratch"
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of parallel Sphinx workers (default: number of CPUs)"
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help=f"Keep running: rebuild when {SOURCE_DIR} changes, inject the hub "
+             f"header into the rebuilt pages and serve {DOCS_ROOT} locally"
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8000,
+        help="Port to serve on with --watch (default: 8000)"
+    )
+    args = parser.parse_args()
+    if args.watch:
+        watch(clean=args.clean, jobs=args.jobs, port=args.port)
+    else:
+        build_home_docs(clean=args.clean, jobs=args.jobs)
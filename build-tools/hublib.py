@@ -0,0 +1,363 @@
+"""
+Shared helpers for the CLAMS Documentation Hub build tools.
+
+The scripts in build-tools/ are run directly (``python build-tools/x.py``),
+which puts this directory on ``sys.path``, so they can ``import hublib``.
+"""
+
+import hashlib
+import importlib.util
+import os
+import re
+import sys
+from collections import defaultdict
+from pathlib import Path
+from urllib.parse import unquote
+
+
+# Directories under docs/ that are not projects (see discover_projects in
+# inject-header.py); docs/assets/ holds hub-wide generated artifacts
+NON_PROJECT_DIRS = ('assets', '.git', '__pycache__')
+
+# href/src attribute values in HTML (double-quoted, as Sphinx writes them)
+HTML_REF_PATTERN = re.compile(r'\b(href|src)="([^"]*)"')
+
+# URL scheme prefix, e.g. "https:" or "mailto:"
+URL_SCHEME_PATTERN = re.compile(r'^[a-zA-Z][a-zA-Z0-9+.-]*:')
+
+# References from CSS to other files
+CSS_URL_PATTERN = re.compile(
+    r'''url\(\s*(?:"([^"]*)"|'([^']*)'|([^)\s]*))\s*\)'''
+)
+CSS_IMPORT_PATTERN = re.compile(r'''@import\s+["']([^"']+)["']''')
+
+# Source map comments in CSS and JS
+SOURCE_MAP_PATTERN = re.compile(r'[#@]\s*sourceMappingURL=([^\s*]+)')
+
+_inject_header = None
+
+
+def load_inject_header():
+    """
+    Import build-tools/inject-header.py, whose name is not importable.
+
+    The module is registered as ``inject_header`` in sys.modules, so its
+    functions can be pickled for (forked) worker processes, as execute_plan
+    does.
+
+    Returns:
+        The inject-header module (loaded once per process)
+    """
+    global _inject_header
+    if _inject_header is None:
+        path = Path(__file__).with_name('inject-header.py')
+        spec = importlib.util.spec_from_file_location('inject_header', path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[spec.name] = module
+        spec.loader.exec_module(module)
+        _inject_header = module
+    return _inject_header
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """Return the hex SHA-256 digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def published_digest(path):
+    """
+    SHA-256 of a published file, ignoring an injected header in HTML pages.
+
+    The digest of a page is the digest it had before injection, so it can be
+    compared with the digest of a freshly built page.
+    """
+    if path.suffix != '.html':
+        return file_digest(path)
+
+    ih = load_inject_header()
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        prefix, span_start, span_end = ih.locate_header_span(f)
+        if span_start is not None and span_end is None:
+            # header in an unexpected place: take the whole-document path
+            data = (prefix + f.read()).decode('utf-8', errors='surrogateescape')
+            data = ih.HEADER_PATTERN.sub('', data)
+            return ih.content_digest(data.encode('utf-8', errors='surrogateescape'))
+        if span_start is None:
+            digest.update(prefix)
+        else:
+            digest.update(prefix[:span_start])
+            digest.update(prefix[span_end:])
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_if_changed(path, data):
+    """
+    Replace a file atomically unless it already holds exactly data.
+
+    Args:
+        path: Path of the file
+        data: The new contents (str, written as UTF-8, or bytes)
+
+    Returns:
+        Whether the file was written
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    try:
+        if Path(path).read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        pass
+    load_inject_header().write_file_atomically(path, data)
+    return True
+
+
+def format_bytes(size):
+    """Format a byte count for humans, e.g. 1536 -> '1.5 KiB'."""
+    for unit in ('B', 'KiB', 'MiB'):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def project_of(path, docs_root):
+    """Name of the project (top-level docs/ directory) containing path."""
+    return Path(path).relative_to(docs_root).parts[0]
+
+
+def iter_project_files(docs_root, suffixes=None):
+    """
+    Yield every file under the project directories of docs_root.
+
+    Args:
+        docs_root: Path to the docs/ directory
+        suffixes: Optional collection of lowercase suffixes (e.g. {'.html'})
+            to restrict the walk to
+
+    Yields:
+        Path objects, in sorted order per directory
+    """
+    docs_path = Path(docs_root)
+    for item in sorted(docs_path.iterdir()):
+        if not item.is_dir() or item.name in NON_PROJECT_DIRS:
+            continue
+        for path in sorted(item.rglob('*')):
+            if suffixes is not None and path.suffix.lower() not in suffixes:
+                continue
+            if path.is_file():
+                yield path
+
+
+def split_url(url):
+    """Split a URL into (path, suffix), where suffix is any ?query/#fragment."""
+    for i, char in enumerate(url):
+        if char in '?#':
+            return url[:i], url[i:]
+    return url, ''
+
+
+def resolve_local_reference(source_path, url):
+    """
+    Resolve a relative URL found in a file to the local path it points to.
+
+    Args:
+        source_path: Path of the file the URL appears in
+        url: The URL (href/src value)
+
+    Returns:
+        Normalized Path of the target, or None for URLs that are not
+        relative paths (external, root-relative, data:, fragment-only, ...)
+    """
+    if not url or url.startswith(('#', '/')) or URL_SCHEME_PATTERN.match(url):
+        return None
+    path, _ = split_url(url)
+    if not path:
+        return None
+    target = os.path.join(os.path.dirname(source_path), unquote(path))
+    return Path(os.path.normpath(target))
+
+
+def resolve_hub_url(url, docs_root, base_url):
+    """
+    Resolve an absolute hub URL to the local path under docs_root it serves.
+
+    Both ``{base_url}/...`` URLs (as written by inject-header.py) and
+    root-relative ``/...`` URLs are recognized.
+
+    Returns:
+        Normalized Path of the target, or None for other URLs
+    """
+    path, _ = split_url(url)
+    base_url = base_url.rstrip('/')
+    if path.startswith(base_url + '/'):
+        path = path[len(base_url):]
+    elif not path.startswith('/') or path.startswith('//'):
+        return None
+    target = os.path.join(docs_root, unquote(path.lstrip('/')))
+    return Path(os.path.normpath(target))
+
+
+def relative_url(source_path, target_path):
+    """URL (POSIX path) of target_path relative to the file source_path."""
+    rel = os.path.relpath(target_path, os.path.dirname(source_path))
+    return Path(rel).as_posix()
+
+
+def scan_page_references(docs_root, assets, base_url):
+    """
+    Find the HTML pages loading assets through href/src attributes.
+
+    Args:
+        docs_root: Path to the docs/ directory
+        assets: Collection of asset Paths, all inside ``_static`` directories
+        base_url: Base URL of the hub, to recognize absolute references
+
+    Returns:
+        Tuple of (reference_counts, pages, absolute): reference_counts maps
+        assets to their number of relative references; pages lists the HTML
+        Paths with at least one; absolute is the set of assets referenced by
+        absolute hub URLs (e.g. the header logo), which must stay where they
+        are
+    """
+    counts = defaultdict(int)
+    pages = []
+    absolute = set()
+    for html_path in iter_project_files(docs_root, {'.html'}):
+        text = html_path.read_text(encoding='utf-8', errors='replace')
+        found = False
+        for _, url in HTML_REF_PATTERN.findall(text):
+            if '_static' not in url:
+                continue
+            target = resolve_local_reference(html_path, url)
+            if target in assets:
+                counts[target] += 1
+                found = True
+                continue
+            target = resolve_hub_url(url, docs_root, base_url)
+            if target in assets:
+                absolute.add(target)
+        if found:
+            pages.append(html_path)
+    return counts, pages, absolute
+
+
+def rewrite_page_references(html_path, new_paths):
+    """
+    Point href/src attributes of a page at assets that moved.
+
+    Args:
+        html_path: Path of the HTML page
+        new_paths: Dict mapping asset Paths to the Paths they moved to
+
+    Returns:
+        Number of attributes rewritten
+    """
+    text = html_path.read_text(encoding='utf-8')
+    rewritten = 0
+
+    def replace(match):
+        nonlocal rewritten
+        attr, url = match.groups()
+        target = resolve_local_reference(html_path, url)
+        if target not in new_paths:
+            return match.group(0)
+        rewritten += 1
+        _, suffix = split_url(url)
+        return f'{attr}="{relative_url(html_path, new_paths[target]) + suffix}"'
+
+    new_text = HTML_REF_PATTERN.sub(replace, text)
+    if rewritten:
+        load_inject_header().write_file_atomically(html_path, new_text.encode('utf-8'))
+    return rewritten
+
+
+def static_root(path):
+    """The innermost ``_static`` directory containing path."""
+    for parent in path.parents:
+        if parent.name == '_static':
+            return parent
+    raise ValueError(f"Not a static asset: {path}")
+
+
+def named_in_scripts(assets):
+    """
+    Assets whose file name appears in a script of their ``_static`` tree.
+
+    Such scripts may build URLs from the name at runtime (``doctools.js``
+    swaps ``minus.png`` and ``plus.png``), so renaming the asset or pointing
+    pages at another file would break them. Source map comments do not
+    count; they are rewritten like other references.
+
+    Args:
+        assets: Paths of files inside ``_static`` directories, including the
+            scripts to search
+
+    Returns:
+        Set of the named asset Paths
+    """
+    scripts = defaultdict(list)
+    for path in assets:
+        if path.suffix == '.js':
+            try:
+                text = path.read_text(encoding='utf-8')
+            except UnicodeDecodeError:
+                continue
+            scripts[static_root(path)].append(
+                (path, SOURCE_MAP_PATTERN.sub('', text)))
+
+    named = set()
+    for path in assets:
+        for script, text in scripts[static_root(path)]:
+            if script != path and path.name in text:
+                named.add(path)
+                break
+    return named
+
+
+def asset_reference_spans(text, suffix):
+    """
+    Locate the URLs a CSS or JS asset's text references.
+
+    Args:
+        text: Contents of the asset
+        suffix: Suffix of the asset ('.css' or '.js'; others have none)
+
+    Returns:
+        List of (start, end) offsets of the URLs in text, in order
+    """
+    if suffix not in ('.css', '.js'):
+        return []
+    spans = []
+    if suffix == '.css':
+        for match in CSS_URL_PATTERN.finditer(text):
+            group = next(i for i, g in enumerate(match.groups(), 1) if g is not None)
+            spans.append(match.span(group))
+        spans.extend(match.span(1) for match in CSS_IMPORT_PATTERN.finditer(text))
+    spans.extend(match.span(1) for match in SOURCE_MAP_PATTERN.finditer(text))
+    return sorted(spans)
+
+
+def asset_references(path):
+    """
+    Relative references from a CSS or JS asset to other files.
+
+    Returns:
+        List of URLs (data:, external and fragment-only URLs excluded)
+    """
+    if path.suffix not in ('.css', '.js'):
+        return []
+    try:
+        text = path.read_text(encoding='utf-8')
+    except (OSError, UnicodeDecodeError):
+        return []
+
+    urls = [text[start:end] for start, end in asset_reference_spans(text, path.suffix)]
+    return [url for url in urls if resolve_local_reference(path, url)]
@@ -10,23 +10,109 @@ version selector for the current project.
 Usage:
     python build/inject.py docs/mmif-python/
     python build/inject.py docs/home/
+    python build/inject.py docs/ --all --jobs 4
 """
 
 import argparse
+import contextlib
+import functools
+import hashlib
+import json
+import os
 import re
-import shutil
+import stat
+import subprocess
 import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
 
 # canonical base URL for the documentation hub
 DEFAULT_BASE_URL = 'https://clams.ai'
 
-# Header template with embedded CSS
+# Manifest recording, per HTML file, the hash of its content after injection
+# and the hash of the header it received, and per injected directory the hash
+# of its header. Stored in the docs root and committed alongside the published
+# pages so CI runs can skip unchanged files (and, given a change set, unchanged
+# directories).
+MANIFEST_FILENAME = '.inject-manifest.json'
+MANIFEST_FORMAT_VERSION = 1
+
+# Number of files handed to a worker process at a time
+BATCH_SIZE = 32
+
+# Markers delimiting an injected header
+HEADER_START_MARKER = '<!-- CLAMS Hub Version Header - Injected -->'
+HEADER_END_MARKER = '<!-- End CLAMS Hub Version Header -->'
+
+# Legacy whole-document pattern for an injected header (see splice_header_regex)
+HEADER_PATTERN = re.compile(
+    r'\n?' + re.escape(HEADER_START_MARKER) + r'.*?'
+    + re.escape(HEADER_END_MARKER) + r'\n?',
+    flags=re.DOTALL
+)
+BODY_TAG_PATTERN = re.compile(r'<body[^>]*>')
+
+# Byte-level equivalents used by the streaming splice
+HEADER_START_BYTES = HEADER_START_MARKER.encode('utf-8')
+HEADER_END_BYTES = HEADER_END_MARKER.encode('utf-8')
+BODY_TAG_BYTES_PATTERN = re.compile(rb'<body[^>]*>')
+
+# Initial number of bytes read when looking for the splice point; doubled
+# until the <body> tag (and any existing header after it) is in view
+HEAD_CHUNK_SIZE = 64 * 1024
+
+# Chunk size for streaming the rest of a page after the spliced head
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Results of injecting a header into a single file
+UNCHANGED = 'unchanged'  # file already had exactly this header; not written
+UPDATED = 'updated'      # file was rewritten
+FAILED = 'failed'        # file could not be read, parsed or written
+
+# Per-file phases recorded by --stats (see file_stats_record)
+FILE_PHASES = ('manifest', 'read', 'splice', 'optimize', 'write')
+
+# Number of slowest files listed in the --stats summary
+STATS_SLOWEST_FILES = 10
+
+# Injected header without the newline after it, which optimized pages keep
+# (see inject_header_into_file_optimized)
+HEADER_ONLY_PATTERN = re.compile(
+    r'\n?' + re.escape(HEADER_START_MARKER) + r'.*?' + re.escape(HEADER_END_MARKER),
+    flags=re.DOTALL
+)
+
+# Regions --optimize leaves untouched: comments and elements whose
+# whitespace matters or that are not HTML
+PRESERVED_PATTERN = re.compile(
+    r'<!--.*?-->|<(pre|textarea|script|style)\b.*?</\1\s*>',
+    flags=re.DOTALL | re.IGNORECASE
+)
+
+# Tags (kept as they are, so attribute values never change) or runs of
+# whitespace between them
+TAG_OR_WHITESPACE_PATTERN = re.compile(r'(<[^>]*>)|[ \t\r\n\f]{2,}')
+
+IMG_TAG_PATTERN = re.compile(r'<img\b[^>]*>', flags=re.IGNORECASE)
+SCRIPT_OPEN_TAG_PATTERN = re.compile(r'<script\b[^>]*>', flags=re.IGNORECASE)
+TAG_NAME_PATTERN = re.compile(r'<[^\s/>]*')
+ATTRIBUTE_NAME_PATTERN = re.compile(
+    r'\s([^\s=/>]+)(?:\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]*)))?'
+)
+
+# Script types run as classic scripts (a missing type counts as one too)
+CLASSIC_SCRIPT_TYPES = {'', 'text/javascript', 'application/javascript'}
+
+# Mixed into the manifest's header digest of optimized pages; bump it when
+# the optimizer's output changes so optimized pages are redone
+OPTIMIZER_VERSION = 1
+
+# Header stylesheet for versioned projects
 # Supports both light and dark modes (Furo theme compatibility)
-HEADER_TEMPLATE = '''<!-- CLAMS Hub Version Header - Injected -->
-<style>
-.clams-version-header {{
+HEADER_CSS = '''.clams-version-header {
     background: #f8f9fa;
     border-bottom: 1px solid #dee2e6;
     padding: 8px 16px;
@@ -37,110 +123,90 @@ HEADER_TEMPLATE = '''<!-- CLAMS Hub Version Header - Injected -->
     justify-content: space-between;
     flex-wrap: wrap;
     gap: 8px;
-}}
-@media (prefers-color-scheme: dark) {{
-    body:not([data-theme="light"]) .clams-version-header {{
+}
+@media (prefers-color-scheme: dark) {
+    body:not([data-theme="light"]) .clams-version-header {
         background: #1a1a1a;
         border-bottom-color: #333;
-    }}
-    body:not([data-theme="light"]) .clams-version-header a {{
+    }
+    body:not([data-theme="light"]) .clams-version-header a {
         color: #6cb6ff;
-    }}
-    body:not([data-theme="light"]) .clams-version-header select {{
+    }
+    body:not([data-theme="light"]) .clams-version-header select {
         background: #2d2d2d;
         color: #e0e0e0;
         border-color: #444;
-    }}
-    body:not([data-theme="light"]) .clams-version-header .nav-link.active {{
+    }
+    body:not([data-theme="light"]) .clams-version-header .nav-link.active {
         background: #333;
-    }}
-}}
-body[data-theme="dark"] .clams-version-header {{
+    }
+}
+body[data-theme="dark"] .clams-version-header {
     background: #1a1a1a;
     border-bottom-color: #333;
-}}
-body[data-theme="dark"] .clams-version-header a {{
+}
+body[data-theme="dark"] .clams-version-header a {
     color: #6cb6ff;
-}}
-body[data-theme="dark"] .clams-version-header select {{
+}
+body[data-theme="dark"] .clams-version-header select {
     background: #2d2d2d;
     color: #e0e0e0;
     border-color: #444;
-}}
-body[data-theme="dark"] .clams-version-header .nav-link.active {{
+}
+body[data-theme="dark"] .clams-version-header .nav-link.active {
     background: #333;
-}}
-.clams-version-header a {{
+}
+.clams-version-header a {
     color: #008AFF;
     text-decoration: none;
-}}
-.clams-version-header a:hover {{
+}
+.clams-version-header a:hover {
     text-decoration: underline;
-}}
-.clams-version-header .header-left {{
+}
+.clams-version-header .header-left {
     display: flex;
     align-items: center;
     gap: 16px;
-}}
-.clams-version-header .logo {{
+}
+.clams-version-header .logo {
     height: 28px;
     width: auto;
-}}
-.clams-version-header .project-nav {{
+}
+.clams-version-header .project-nav {
     display: flex;
     align-items: center;
     gap: 4px;
-}}
-.clams-version-header .nav-link {{
+}
+.clams-version-header .nav-link {
     padding: 4px 8px;
     border-radius: 4px;
     font-size: 13px;
-}}
-.clams-version-header .nav-link:hover {{
+}
+.clams-version-header .nav-link:hover {
     background: #e9ecef;
     text-decoration: none;
-}}
-.clams-version-header .nav-link.active {{
+}
+.clams-version-header .nav-link.active {
     background: #e9ecef;
     font-weight: 600;
-}}
-.clams-version-header .header-right {{
+}
+.clams-version-header .header-right {
     display: flex;
     align-items: center;
     gap: 12px;
-}}
-.clams-version-header select {{
+}
+.clams-version-header select {
     padding: 4px 8px;
     border: 1px solid #ccc;
     border-radius: 4px;
     background: white;
     cursor: pointer;
     font-size: 13px;
-}}
-</style>
-<div class="clams-version-header">
-    <div class="header-left">
-        <a href="{hub_url}" title="CLAMS Documentation Hub">
-            <img src="{logo_url}" alt="CLAMS" class="logo">
-        </a>
-        <nav class="project-nav">
-{project_nav_links}
-        </nav>
-    </div>
-    <div class="header-right">
-        <select onchange="if(this.value) window.location.href=this.value;">
-            <option value="">Switch version...</option>
-{version_options}
-        </select>
-    </div>
-</div>
-<!-- End CLAMS Hub Version Header -->
+}
 '''
 
-# Header template for non-versioned projects (no version dropdown)
-HEADER_TEMPLATE_NO_VERSION = '''<!-- CLAMS Hub Version Header - Injected -->
-<style>
-.clams-version-header {{
+# Header stylesheet for non-versioned projects (no version dropdown)
+HEADER_CSS_NO_VERSION = '''.clams-version-header {
     background: #f8f9fa;
     border-bottom: 1px solid #dee2e6;
     padding: 8px 16px;
@@ -149,64 +215,144 @@ HEADER_TEMPLATE_NO_VERSION = '''<!-- CLAMS Hub Version Header - Injected -->
     display: flex;
     align-items: center;
     gap: 8px;
-}}
-@media (prefers-color-scheme: dark) {{
-    body:not([data-theme="light"]) .clams-version-header {{
+}
+@media (prefers-color-scheme: dark) {
+    body:not([data-theme="light"]) .clams-version-header {
         background: #1a1a1a;
         border-bottom-color: #333;
-    }}
-    body:not([data-theme="light"]) .clams-version-header a {{
+    }
+    body:not([data-theme="light"]) .clams-version-header a {
         color: #6cb6ff;
-    }}
-    body:not([data-theme="light"]) .clams-version-header .nav-link.active {{
+    }
+    body:not([data-theme="light"]) .clams-version-header .nav-link.active {
         background: #333;
-    }}
-}}
-body[data-theme="dark"] .clams-version-header {{
+    }
+}
+body[data-theme="dark"] .clams-version-header {
     background: #1a1a1a;
     border-bottom-color: #333;
-}}
-body[data-theme="dark"] .clams-version-header a {{
+}
+body[data-theme="dark"] .clams-version-header a {
     color: #6cb6ff;
-}}
-body[data-theme="dark"] .clams-version-header .nav-link.active {{
+}
+body[data-theme="dark"] .clams-version-header .nav-link.active {
     background: #333;
-}}
-.clams-version-header a {{
+}
+.clams-version-header a {
     color: #008AFF;
     text-decoration: none;
-}}
-.clams-version-header a:hover {{
+}
+.clams-version-header a:hover {
     text-decoration: underline;
-}}
-.clams-version-header .header-left {{
+}
+.clams-version-header .header-left {
     display: flex;
     align-items: center;
     gap: 16px;
-}}
-.clams-version-header .logo {{
+}
+.clams-version-header .logo {
     height: 28px;
     width: auto;
-}}
-.clams-version-header .project-nav {{
+}
+.clams-version-header .project-nav {
     display: flex;
     align-items: center;
     gap: 4px;
-}}
-.clams-version-header .nav-link {{
+}
+.clams-version-header .nav-link {
     padding: 4px 8px;
     border-radius: 4px;
     font-size: 13px;
-}}
-.clams-version-header .nav-link:hover {{
+}
+.clams-version-header .nav-link:hover {
     background: #e9ecef;
     text-decoration: none;
-}}
-.clams-version-header .nav-link.active {{
+}
+.clams-version-header .nav-link.active {
     background: #e9ecef;
     font-weight: 600;
-}}
-</style>
+}
+'''
+
+# Inline form of the header style ({css} is one of the stylesheets above)
+HEADER_STYLE_INLINE = '''<style>
+{css}</style>'''
+
+# Linked form of the header style, used with a shared stylesheet file
+HEADER_STYLE_LINK = '<link rel="stylesheet" href="{stylesheet_url}">'
+
+# Script filling the version selector from the project's versions.json at
+# page load (see --versions-json). The baked-in "(current)" option is moved
+# into its place in the list.
+VERSION_SELECT_SCRIPT = '''
+        <script>
+        (function (select) {
+            fetch(select.dataset.versionsUrl).then(function (response) {
+                return response.json();
+            }).then(function (data) {
+                var current = select.querySelector('option[selected]');
+                data.versions.forEach(function (entry) {
+                    if (entry.version === select.dataset.currentVersion) {
+                        select.appendChild(current);
+                        return;
+                    }
+                    var option = document.createElement('option');
+                    option.value = entry.url;
+                    option.textContent = entry.label;
+                    select.appendChild(option);
+                });
+            });
+        })(document.currentScript.previousElementSibling);
+        </script>'''
+
+# Speculation rules letting the browser prefetch a page as soon as a link
+# to it is hovered or pressed: the header's hub, logo and project links and
+# the previous/next links of the toctree (see --prefetch). Browsers without
+# speculation rules ignore the script.
+PREFETCH_RULES = '''
+<script type="speculationrules">
+{"prefetch": [{"where": {"selector_matches": ".clams-version-header a, a.next-page, a.prev-page, a[rel~=next], a[rel~=prev]"}, "eagerness": "moderate"}]}
+</script>'''
+
+# Name of the per-project version list written for the client-side selector
+VERSIONS_JSON_FILENAME = 'versions.json'
+
+# The shared stylesheet is HEADER_CSS, which also fits the non-versioned
+# header: its extra rules only matter when a version selector is present.
+# It is written under home/_static/ with a content hash in its name, so it
+# can be cached indefinitely.
+HEADER_STYLESHEET_DIR = 'home/_static'
+HEADER_STYLESHEET_PREFIX = 'clams-hub-header'
+
+# Logo shown in the header, relative to the docs root; its WebP variant
+# (see optimize-images.py) is used instead when it exists
+HEADER_LOGO_PATH = 'home/_static/clams-logo.png'
+
+# Header template with a version selector
+HEADER_TEMPLATE = '''<!-- CLAMS Hub Version Header - Injected -->
+{header_style}
+<div class="clams-version-header">
+    <div class="header-left">
+        <a href="{hub_url}" title="CLAMS Documentation Hub">
+            <img src="{logo_url}" alt="CLAMS" class="logo">
+        </a>
+        <nav class="project-nav">
+{project_nav_links}
+        </nav>
+    </div>
+    <div class="header-right">
+        <select{select_attrs} onchange="if(this.value) window.location.href=this.value;">
+            <option value="">Switch version...</option>
+{version_options}
+        </select>{version_script}
+    </div>
+</div>{prefetch_rules}
+<!-- End CLAMS Hub Version Header -->
+'''
+
+# Header template for non-versioned projects (no version dropdown)
+HEADER_TEMPLATE_NO_VERSION = '''<!-- CLAMS Hub Version Header - Injected -->
+{header_style}
 <div class="clams-version-header">
     <div class="header-left">
         <a href="{hub_url}" title="CLAMS Documentation Hub">
@@ -216,7 +362,7 @@ body[data-theme="dark"] .clams-version-header .nav-link.active {{
 {project_nav_links}
         </nav>
     </div>
-</div>
+</div>{prefetch_rules}
 <!-- End CLAMS Hub Version Header -->
 '''
 
@@ -241,19 +387,30 @@ def discover_versions(project_dir):
     """
     Discover all version subdirectories in the project directory.
 
+    Results are cached for the rest of the run, keyed by the directory's
+    modification time, which changes whenever a version is added or removed.
+
     Args:
         project_dir: Path to the project documentation directory
 
     Returns:
         List of version strings, sorted with latest/newest first
     """
-    versions = []
     project_path = Path(project_dir)
 
     if not project_path.is_dir():
         raise ValueError(f"Directory not found: {project_dir}")
 
-    for item in project_path.iterdir():
+    return list(_discover_versions(
+        str(project_path.resolve()), project_path.stat().st_mtime_ns
+    ))
+
+
+@functools.lru_cache(maxsize=None)
+def _discover_versions(project_dir, mtime_ns):
+    """Cached body of discover_versions; returns a tuple."""
+    versions = []
+    for item in Path(project_dir).iterdir():
         if item.is_dir():
             # Check if it looks like a version directory
             name = item.name
@@ -264,32 +421,49 @@ def discover_versions(project_dir):
     # Sort versions: latest first, then by version number (newest first)
     versions.sort(key=parse_version, reverse=True)
 
-    return versions
+    return tuple(versions)
 
 
 def discover_projects(docs_root):
     """
     Discover all project subdirectories in the docs root.
 
+    Results are cached for the rest of the run. The cache key holds the
+    modification times of the docs root and of every directory in it, so
+    adding, removing or filling a project directory invalidates it.
+
     Args:
         docs_root: Path to the docs/ directory
 
     Returns:
         Dict mapping project names to their info (is_versioned)
     """
-    projects = {}
     docs_path = Path(docs_root)
 
     if not docs_path.is_dir():
-        return projects
+        return {}
+
+    signature = (docs_path.stat().st_mtime_ns,) + tuple(sorted(
+        (entry.name, entry.stat().st_mtime_ns)
+        for entry in os.scandir(docs_path) if entry.is_dir()
+    ))
+    projects = _discover_projects(
+        str(docs_path.resolve()), signature, frozenset(VERSIONED_PROJECTS)
+    )
+    return {name: {'is_versioned': is_versioned} for name, is_versioned in projects}
+
 
-    for item in docs_path.iterdir():
+@functools.lru_cache(maxsize=None)
+def _discover_projects(docs_root, signature, versioned_projects):
+    """Cached body of discover_projects; returns (name, is_versioned) pairs."""
+    projects = []
+    for item in Path(docs_root).iterdir():
         if item.is_dir():
             name = item.name
             # Skip assets and other non-project directories
             if name in ('assets', '.git', '__pycache__'):
                 continue
-            has_versions = name in VERSIONED_PROJECTS
+            has_versions = name in versioned_projects
             # Check if it has HTML files or subdirectories
             has_content = any(
                 (f.suffix == '.html' and f.is_file())
@@ -297,9 +471,9 @@ def discover_projects(docs_root):
                 for f in item.iterdir()
             )
             if has_content:
-                projects[name] = {'is_versioned': has_versions}
+                projects.append((name, has_versions))
 
-    return projects
+    return tuple(projects)
 
 
 # Projects with versioned documentation deployments (each release gets
@@ -328,6 +502,9 @@ def generate_project_nav_links(projects, current_project, base_url):
     3. Subdirs with only [a-z] chars, alphabetically
     4. Remaining subdirs, alphabetically
 
+    The links are rendered once per (project set, current project,
+    base_url) and cached for the rest of the run.
+
     Args:
         projects: Dict mapping project names to their info
         current_project: Name of the current project
@@ -336,6 +513,12 @@ def generate_project_nav_links(projects, current_project, base_url):
     Returns:
         String of HTML anchor elements
     """
+    return _project_nav_links(tuple(sorted(projects)), current_project, base_url)
+
+
+@functools.lru_cache(maxsize=None)
+def _project_nav_links(projects, current_project, base_url):
+    """Cached body of generate_project_nav_links; projects is a sorted tuple."""
     links = []
 
     # 1. Home is always first (if it exists)
@@ -396,6 +579,13 @@ def generate_project_nav_links(projects, current_project, base_url):
     return '\n'.join(links)
 
 
+def version_label(version):
+    """Display label of a version in the version selector."""
+    if version == 'latest':
+        return 'latest (development)'
+    return version
+
+
 def generate_version_options(versions, current_version, base_url, project_name):
     """
     Generate HTML option elements for the version selector.
@@ -420,21 +610,100 @@ def generate_version_options(versions, current_version, base_url, project_name):
                 f'{version} (current)</option>'
             )
         else:
-            label = version
-            if version == 'latest':
-                label = 'latest (development)'
             options.append(
-                f'            <option value="{url}">{label}</option>'
+                f'            <option value="{url}">{version_label(version)}</option>'
             )
 
     return '\n'.join(options)
 
 
+def generate_versions_json(versions, base_url, project_name):
+    """
+    Generate the contents of a project's versions.json.
+
+    Args:
+        versions: List of all versions, in selector order
+        base_url: Base URL for the documentation hub
+        project_name: Name of the project
+
+    Returns:
+        JSON string listing each version with its label and absolute URL
+    """
+    data = {
+        'project': project_name,
+        'versions': [
+            {
+                'version': version,
+                'label': version_label(version),
+                'url': f"{base_url}/{project_name}/{version}/",
+            }
+            for version in versions
+        ],
+    }
+    return json.dumps(data, indent=1) + '\n'
+
+
+def write_versions_json(project_dir, versions, base_url, project_name,
+                        dry_run=False):
+    """Write versions.json into the project directory if its content changed."""
+    json_path = Path(project_dir) / VERSIONS_JSON_FILENAME
+    data = generate_versions_json(versions, base_url, project_name).encode('utf-8')
+    try:
+        if json_path.read_bytes() == data:
+            return
+    except FileNotFoundError:
+        pass
+
+    if dry_run:
+        print(f"  Would write {json_path}")
+        return
+    write_file_atomically(json_path, data)
+    print(f"  Wrote {json_path} ({len(versions)} versions)")
+
+
+def header_stylesheet_name(css=HEADER_CSS):
+    """File name of the shared header stylesheet, e.g. clams-hub-header.1a2b3c4d5e.css."""
+    return f"{HEADER_STYLESHEET_PREFIX}.{content_digest(css)[:10]}.css"
+
+
+def write_header_stylesheet(docs_root):
+    """
+    Write the shared header stylesheet under the docs root, if missing.
+
+    Args:
+        docs_root: Path to the docs/ directory
+
+    Returns:
+        Path of the stylesheet relative to the docs root (POSIX string)
+    """
+    relative_path = f"{HEADER_STYLESHEET_DIR}/{header_stylesheet_name()}"
+    stylesheet_path = Path(docs_root) / relative_path
+    if not stylesheet_path.is_file():
+        stylesheet_path.parent.mkdir(parents=True, exist_ok=True)
+        write_file_atomically(stylesheet_path, HEADER_CSS.encode('utf-8'))
+        print(f"Wrote header stylesheet {stylesheet_path}")
+    return relative_path
+
+
+def header_logo_path(docs_root):
+    """Path of the header logo, preferring its WebP variant if it exists."""
+    webp_path = Path(HEADER_LOGO_PATH).with_suffix('.webp').as_posix()
+    if (Path(docs_root) / webp_path).is_file():
+        return webp_path
+    return HEADER_LOGO_PATH
+
+
 def generate_header(project_name, current_version, versions, projects,
-                    base_url, is_versioned=True):
+                    base_url, is_versioned=True, stylesheet_url=None,
+                    versions_json=False, prefetch=False,
+                    logo_path=HEADER_LOGO_PATH):
     """
     Generate the complete header HTML for injection.
 
+    Headers are cached for the rest of the run, keyed by the arguments
+    (with the project set and version list as tuples), so each distinct
+    header is rendered once.
+
     Args:
         project_name: Name of the project
         current_version: Current version being processed (None for non-versioned)
@@ -442,110 +711,1109 @@ def generate_header(project_name, current_version, versions, projects,
         projects: Dict of all projects in the hub
         base_url: Base URL for the documentation hub
         is_versioned: Whether this project has versioned subdirectories
+        stylesheet_url: URL of the shared header stylesheet; when given, the
+            header links to it instead of embedding its CSS
+        versions_json: If true, only the current version is baked into the
+            selector; the others are loaded from the project's versions.json
+            at runtime, so the header does not change when versions are added
+        prefetch: If true, the header carries speculation rules prefetching
+            the pages its links and the toctree's previous/next links lead to
+        logo_path: Path of the logo image relative to the hub root (see
+            header_logo_path)
 
     Returns:
         Complete header HTML string
     """
+    return _render_header(
+        project_name, current_version, tuple(versions), tuple(sorted(projects)),
+        base_url, is_versioned, stylesheet_url, versions_json, prefetch,
+        logo_path
+    )
+
+
+def generate_header_bytes(project_name, current_version, versions, projects,
+                          base_url, is_versioned=True, stylesheet_url=None,
+                          versions_json=False, prefetch=False,
+                          logo_path=HEADER_LOGO_PATH):
+    """Like generate_header, but UTF-8 encoded (and cached encoded)."""
+    return _render_header_bytes(
+        project_name, current_version, tuple(versions), tuple(sorted(projects)),
+        base_url, is_versioned, stylesheet_url, versions_json, prefetch,
+        logo_path
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _render_header_bytes(*key):
+    return _render_header(*key).encode('utf-8')
+
+
+@functools.lru_cache(maxsize=None)
+def _render_header(project_name, current_version, versions, projects,
+                   base_url, is_versioned, stylesheet_url, versions_json, prefetch,
+                   logo_path):
+    """Cached body of generate_header; versions and projects are tuples."""
     # Build absolute URLs from base_url
     hub_url = f"{base_url}/"
-    logo_url = f"{base_url}/home/_static/clams-logo.png"
+    logo_url = f"{base_url}/{logo_path}"
 
     project_nav_links = generate_project_nav_links(
         projects, project_name, base_url
     )
+    prefetch_rules = PREFETCH_RULES if prefetch else ''
 
     if is_versioned and versions:
-        version_options = generate_version_options(
-            versions, current_version, base_url, project_name
-        )
+        if stylesheet_url:
+            header_style = HEADER_STYLE_LINK.format(stylesheet_url=stylesheet_url)
+        else:
+            header_style = HEADER_STYLE_INLINE.format(css=HEADER_CSS)
+        if versions_json:
+            version_options = generate_version_options(
+                [current_version], current_version, base_url, project_name
+            )
+            select_attrs = (
+                f' data-versions-url="{base_url}/{project_name}/'
+                f'{VERSIONS_JSON_FILENAME}"'
+                f' data-current-version="{current_version}"'
+            )
+            version_script = VERSION_SELECT_SCRIPT
+        else:
+            version_options = generate_version_options(
+                versions, current_version, base_url, project_name
+            )
+            select_attrs = ''
+            version_script = ''
         return HEADER_TEMPLATE.format(
+            header_style=header_style,
+            select_attrs=select_attrs,
+            version_script=version_script,
             project_name=project_name,
             current_version=current_version,
             version_options=version_options,
             project_nav_links=project_nav_links,
+            prefetch_rules=prefetch_rules,
             hub_url=hub_url,
             logo_url=logo_url
         )
     else:
+        if stylesheet_url:
+            header_style = HEADER_STYLE_LINK.format(stylesheet_url=stylesheet_url)
+        else:
+            header_style = HEADER_STYLE_INLINE.format(css=HEADER_CSS_NO_VERSION)
         return HEADER_TEMPLATE_NO_VERSION.format(
+            header_style=header_style,
             project_nav_links=project_nav_links,
+            prefetch_rules=prefetch_rules,
             hub_url=hub_url,
             logo_url=logo_url
         )
 
 
-def inject_header_into_file(file_path, header_html):
+def content_digest(data):
+    """Return the hex SHA-256 digest of ``data`` (bytes or str)."""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+
+def injection_digest(header_html, optimize=False):
     """
-    Inject the header into a single HTML file.
+    Digest recorded in the manifest for pages injected with header_html.
 
-    The header is inserted right after the <body> tag.
-    If the file already has an injected header, it is replaced.
+    This is the header's digest, salted for optimized pages, so turning
+    --optimize on or off (or a new OPTIMIZER_VERSION) redoes every page.
+    """
+    if isinstance(header_html, str):
+        header_html = header_html.encode('utf-8')
+    if optimize:
+        header_html += f'\0optimize:{OPTIMIZER_VERSION}'.encode('utf-8')
+    return content_digest(header_html)
+
+
+def load_manifest(manifest_path, section='files'):
+    """
+    Load a section of the injection manifest.
 
     Args:
-        file_path: Path to the HTML file
-        header_html: The header HTML to inject
+        manifest_path: Path to the manifest JSON file
+        section: 'files' or 'targets'
 
     Returns:
-        True if injection was successful, False otherwise
+        For 'files', a dict mapping file keys (paths relative to the docs
+        root) to ``{'content': <sha256>, 'header': <sha256>}`` entries; for
+        'targets', a dict mapping injected directories (relative to the docs
+        root) to the sha256 of the header they last received. Empty if the
+        manifest is missing, unreadable, or from another format version.
     """
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-    except Exception as e:
-        print(f"  Error reading {file_path}: {e}", file=sys.stderr)
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"  Warning: Ignoring unreadable manifest {manifest_path}: {e}",
+              file=sys.stderr)
+        return {}
+
+    if data.get('version') != MANIFEST_FORMAT_VERSION:
+        return {}
+    return data.get(section, {})
+
+
+def save_manifest(manifest_path, entries, targets=None):
+    """Write the injection manifest with entries sorted for stable diffs."""
+    data = {
+        'version': MANIFEST_FORMAT_VERSION,
+        'files': {key: entries[key] for key in sorted(entries)},
+    }
+    if targets:
+        data['targets'] = {key: targets[key] for key in sorted(targets)}
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=1)
+        f.write('\n')
+
+
+def manifest_key(file_path, docs_root):
+    """Key for ``file_path`` in the manifest: its POSIX path under docs_root."""
+    return Path(file_path).relative_to(docs_root).as_posix()
+
+
+def prune_manifest(manifest, project_dir, docs_root):
+    """
+    Drop manifest entries for files at or under project_dir that no longer
+    exist.
+
+    Returns:
+        Number of entries removed
+    """
+    base = manifest_key(project_dir, docs_root)
+    prefix = base + '/'
+    stale = [
+        key for key in manifest
+        if (key == base or key.startswith(prefix))
+        and not (Path(docs_root) / key).is_file()
+    ]
+    for key in stale:
+        del manifest[key]
+    return len(stale)
+
+
+def is_up_to_date(file_path, header_digest, manifest, docs_root):
+    """
+    Check whether a file already carries the given header, per the manifest.
+
+    The file's current bytes are hashed and compared with the recorded
+    post-injection hash, so any change to the page body (e.g. a fresh
+    Sphinx build copied over it) is detected as well as header changes.
+    """
+    entry = manifest.get(manifest_key(file_path, docs_root))
+    if not entry or entry.get('header') != header_digest:
+        return False
+    try:
+        return content_digest(Path(file_path).read_bytes()) == entry.get('content')
+    except OSError:
         return False
 
-    # Remove existing injected header if present (including leading newline)
-    content = re.sub(
-        r'\n?<!-- CLAMS Hub Version Header - Injected -->.*?'
-        r'<!-- End CLAMS Hub Version Header -->\n?',
-        '',
-        content,
-        flags=re.DOTALL
+
+@contextlib.contextmanager
+def atomic_writer(file_path):
+    """
+    Context manager yielding a binary file that atomically replaces file_path.
+
+    Bytes go to a temporary file in the same directory, which is synced and
+    renamed over the original on success (and removed on error), so readers
+    never see a truncated page. The original file's permission bits are
+    preserved; a new file gets the umask default rather than mkstemp's 0600.
+    """
+    file_path = Path(file_path)
+    try:
+        mode = stat.S_IMODE(file_path.stat().st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = 0o666 & ~umask
+
+    fd, tmp_path = tempfile.mkstemp(
+        dir=file_path.parent, prefix=f'.{file_path.name}.', suffix='.tmp'
     )
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def write_file_atomically(file_path, data):
+    """Replace the contents of file_path with data (bytes) atomically."""
+    with atomic_writer(file_path) as f:
+        f.write(data)
+
+
+def record_timing(timings, phase, start):
+    """Add the seconds since start to timings[phase]; return the current time."""
+    now = time.perf_counter()
+    timings[phase] = timings.get(phase, 0.0) + now - start
+    return now
+
+
+def splice_header_regex(content, header_html):
+    """
+    Splice the header into a whole document held in memory.
+
+    Any injected header anywhere in the document is removed, and the new one
+    is inserted right after the <body> tag.
+
+    Args:
+        content: The HTML document (str)
+        header_html: The header HTML to inject
+
+    Returns:
+        The new document, or None if it has no <body> tag
+    """
+    # Remove existing injected header if present (including leading newline)
+    content = HEADER_PATTERN.sub('', content)
 
     # Find the <body> tag and inject after it
     # Handle various body tag formats: <body>, <body class="...">, etc.
-    body_pattern = r'(<body[^>]*>)'
-    match = re.search(body_pattern, content)
-
+    match = BODY_TAG_PATTERN.search(content)
     if not match:
-        print(f"  Warning: No <body> tag found in {file_path}", file=sys.stderr)
-        return False
+        return None
 
     # Insert header after body tag
     insert_pos = match.end()
-    new_content = content[:insert_pos] + '\n' + header_html + content[insert_pos:]
+    return content[:insert_pos] + '\n' + header_html + content[insert_pos:]
+
+
+def tag_attributes(tag):
+    """Map the lowercase attribute names of an opening tag to their values."""
+    name_end = TAG_NAME_PATTERN.match(tag).end()
+    return {
+        match.group(1).lower(): next((g for g in match.groups()[1:] if g is not None), '')
+        for match in ATTRIBUTE_NAME_PATTERN.finditer(tag, name_end)
+    }
+
+
+def add_attributes(tag, attributes):
+    """Append attributes (strings like 'defer') to an opening tag."""
+    if not attributes:
+        return tag
+    self_closing = tag.endswith('/>')
+    end = len(tag) - (2 if self_closing else 1)
+    return (tag[:end].rstrip() + ''.join(' ' + a for a in attributes)
+            + (' ' if self_closing else '') + tag[end:])
+
+
+def optimize_img_tag(match):
+    """Let the browser load and decode an image lazily."""
+    tag = match.group(0)
+    attributes = tag_attributes(tag)
+    extra = []
+    # logos are above the fold; loading them lazily would only delay them
+    if 'loading' not in attributes and 'logo' not in attributes.get('class', ''):
+        extra.append('loading="lazy"')
+    if 'decoding' not in attributes:
+        extra.append('decoding="async"')
+    return add_attributes(tag, extra)
+
+
+def is_classic_script(attributes):
+    """Whether a <script> tag's attributes describe a classic script."""
+    return attributes.get('type', '').strip().lower() in CLASSIC_SCRIPT_TYPES
+
+
+def minify_whitespace(segment):
+    """
+    Collapse runs of whitespace between tags.
+
+    A run containing a newline becomes one newline, any other run one space;
+    browsers render both the same as the original run.
+    """
+    return TAG_OR_WHITESPACE_PATTERN.sub(
+        lambda m: m.group(1) or ('\n' if '\n' in m.group(0) else ' '), segment
+    )
+
+
+def optimize_html(content):
+    """
+    Optimize an HTML document (without an injected header) for delivery.
+
+    - Whitespace between tags is collapsed (see minify_whitespace), outside
+      comments and pre, textarea, script and style elements.
+    - Images get loading="lazy" (except logos) and decoding="async".
+    - External classic scripts after the last inline classic script get
+      ``defer``: deferred scripts still run in document order, and no
+      inline script depends on them having run.
+
+    The result is a fixed point: optimizing it again changes nothing.
+
+    Args:
+        content: The HTML document (str)
+
+    Returns:
+        The optimized document (str)
+    """
+    preserved = list(PRESERVED_PATTERN.finditer(content))
+    scripts = []
+    for match in preserved:
+        if match.group(1) and match.group(1).lower() == 'script':
+            tag = SCRIPT_OPEN_TAG_PATTERN.match(match.group(0)).group(0)
+            scripts.append((match, tag, tag_attributes(tag)))
+    inline_ends = [m.end() for m, _, attrs in scripts
+                   if 'src' not in attrs and is_classic_script(attrs)]
+    defer_after = max(inline_ends, default=0)
+
+    parts = []
+    last = 0
+    script_tags = {m.start(): (tag, attrs) for m, tag, attrs in scripts}
+    for match in preserved:
+        text = content[last:match.start()]
+        parts.append(IMG_TAG_PATTERN.sub(optimize_img_tag, minify_whitespace(text)))
+        element = match.group(0)
+        if match.start() in script_tags:
+            tag, attrs = script_tags[match.start()]
+            if (match.start() >= defer_after and 'src' in attrs
+                    and is_classic_script(attrs)
+                    and not {'async', 'defer'} & set(attrs)):
+                element = add_attributes(tag, ['defer']) + element[len(tag):]
+        parts.append(element)
+        last = match.end()
+    parts.append(IMG_TAG_PATTERN.sub(optimize_img_tag,
+                                     minify_whitespace(content[last:])))
+    return ''.join(parts)
+
+
+def locate_header_span(src):
+    """
+    Read the start of an HTML file just far enough to find the splice span.
+
+    The span starts right after the <body> tag and covers the injected header
+    that directly follows it, if any (with the newlines around it that
+    splice_header_regex would remove). Reading starts with HEAD_CHUNK_SIZE
+    bytes and doubles until the span is in view, so only the top of a page is
+    normally read.
+
+    Args:
+        src: Binary file object positioned at the start of the file
+
+    Returns:
+        Tuple of (prefix, span_start, span_end), where prefix holds the bytes
+        read so far and src is positioned right after them. span_start is
+        None if the file has no <body> tag. span_end is None if the prefix
+        holds a header marker elsewhere than right after <body> (or an
+        unterminated header), in which case the caller must fall back to
+        splice_header_regex.
+    """
+    prefix = b''
+    eof = False
+
+    def read_more():
+        nonlocal prefix, eof
+        chunk = src.read(max(HEAD_CHUNK_SIZE, len(prefix)))
+        if chunk:
+            prefix += chunk
+        else:
+            eof = True
+
+    read_more()
+    while True:
+        match = BODY_TAG_BYTES_PATTERN.search(prefix)
+        if match:
+            break
+        if eof:
+            return prefix, None, None
+        read_more()
+
+    span_start = match.end()
+    marker_pos = span_start
+    while not eof and len(prefix) < span_start + 1 + len(HEADER_START_BYTES):
+        read_more()
+    if prefix.startswith(b'\n' + HEADER_START_BYTES, span_start):
+        marker_pos = span_start + 1
+
+    span_end = span_start
+    if prefix.startswith(HEADER_START_BYTES, marker_pos):
+        end_pos = prefix.find(HEADER_END_BYTES, marker_pos)
+        while end_pos == -1 and not eof:
+            read_more()
+            end_pos = prefix.find(HEADER_END_BYTES, marker_pos)
+        if end_pos == -1:
+            return prefix, span_start, None
+        span_end = end_pos + len(HEADER_END_BYTES)
+        while not eof and len(prefix) <= span_end:
+            read_more()
+        if prefix.startswith(b'\n', span_end):
+            span_end += 1
+
+    # headers anywhere else need the whole-document path
+    if (prefix.find(HEADER_START_BYTES, 0, span_start) != -1
+            or prefix.find(HEADER_START_BYTES, span_end) != -1):
+        return prefix, span_start, None
+    return prefix, span_start, span_end
+
+
+def inject_header_into_file_regex(file_path, header_html, timings=None,
+                                  digest=None):
+    """
+    Inject the header by reading the whole file and using splice_header_regex.
 
+    This is the fallback for pages inject_header_into_file cannot splice in a
+    single streaming pass, and the baseline for benchmarks. Arguments and
+    return values are as for inject_header_into_file.
+    """
+    timings = {} if timings is None else timings
+    start = time.perf_counter()
     try:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(new_content)
-        return True
+        with open(file_path, 'rb') as f:
+            original = f.read()
+        content = original.decode('utf-8')
+    except Exception as e:
+        print(f"  Error reading {file_path}: {e}", file=sys.stderr)
+        return FAILED
+    finally:
+        start = record_timing(timings, 'read', start)
+    timings['bytes_in'] = timings.get('bytes_in', 0) + len(original)
+
+    new_content = splice_header_regex(content, header_html)
+    if new_content is None:
+        print(f"  Warning: No <body> tag found in {file_path}", file=sys.stderr)
+        return FAILED
+
+    new_bytes = new_content.encode('utf-8')
+    start = record_timing(timings, 'splice', start)
+    if digest is not None:
+        digest.update(new_bytes)
+    if new_bytes == original:
+        return UNCHANGED
+
+    try:
+        write_file_atomically(file_path, new_bytes)
+        timings['bytes_out'] = timings.get('bytes_out', 0) + len(new_bytes)
+        return UPDATED
     except Exception as e:
         print(f"  Error writing {file_path}: {e}", file=sys.stderr)
-        return False
+        return FAILED
+    finally:
+        record_timing(timings, 'write', start)
+
+
+def inject_header_into_file_optimized(file_path, header_html, timings=None,
+                                      digest=None):
+    """
+    Inject the header and optimize the page (see optimize_html) in one pass.
+
+    The whole page is read once, stripped of any injected header, optimized
+    and given the header again, and written once if anything changed. The
+    newline after the header is left to the page, so optimized pages are a
+    fixed point of this function. Arguments and return values are as for
+    inject_header_into_file; timings also gets the 'optimize' phase and the
+    'bytes_saved' by optimizing.
+    """
+    timings = {} if timings is None else timings
+    if isinstance(header_html, bytes):
+        header_html = header_html.decode('utf-8')
+    start = time.perf_counter()
+    try:
+        with open(file_path, 'rb') as f:
+            original = f.read()
+        content = original.decode('utf-8')
+    except Exception as e:
+        print(f"  Error reading {file_path}: {e}", file=sys.stderr)
+        return FAILED
+    finally:
+        start = record_timing(timings, 'read', start)
+    timings['bytes_in'] = timings.get('bytes_in', 0) + len(original)
+
+    content = HEADER_ONLY_PATTERN.sub('', content)
+    if not BODY_TAG_PATTERN.search(content):
+        print(f"  Warning: No <body> tag found in {file_path}", file=sys.stderr)
+        return FAILED
+    start = record_timing(timings, 'splice', start)
+
+    optimized = optimize_html(content)
+    timings['bytes_saved'] = (timings.get('bytes_saved', 0)
+                              + len(content.encode('utf-8'))
+                              - len(optimized.encode('utf-8')))
+    start = record_timing(timings, 'optimize', start)
+
+    insert_pos = BODY_TAG_PATTERN.search(optimized).end()
+    new_bytes = (optimized[:insert_pos] + '\n' + header_html
+                 + optimized[insert_pos:]).encode('utf-8')
+    start = record_timing(timings, 'splice', start)
+    if digest is not None:
+        digest.update(new_bytes)
+    if new_bytes == original:
+        return UNCHANGED
+
+    try:
+        write_file_atomically(file_path, new_bytes)
+        timings['bytes_out'] = timings.get('bytes_out', 0) + len(new_bytes)
+        return UPDATED
+    except Exception as e:
+        print(f"  Error writing {file_path}: {e}", file=sys.stderr)
+        return FAILED
+    finally:
+        record_timing(timings, 'write', start)
+
+
+def inject_header_into_file(file_path, header_html, timings=None, optimize=False,
+                            digest=None):
+    """
+    Inject the header into a single HTML file.
+
+    The header is inserted right after the <body> tag.
+    If the file already has an injected header, it is replaced.
+
+    Only the top of the page is read to find the span to rewrite (see
+    locate_header_span). If that span already holds this header the file is
+    left untouched; otherwise the new head is written to a temporary file,
+    the rest of the page is streamed after it unchanged, and the result is
+    renamed over the original.
+
+    Args:
+        file_path: Path to the HTML file
+        header_html: The header HTML to inject (str or UTF-8 bytes)
+        timings: Optional dict accumulating seconds spent per phase ('read',
+            'splice', 'write') and the 'bytes_in' read and 'bytes_out'
+            written. Streaming the unread rest of a page counts as 'write'.
+        optimize: Also optimize the page, reading and writing it whole (see
+            inject_header_into_file_optimized)
+        digest: Optional hashlib object fed the file's resulting contents,
+            as they are written (or read, if the file is left untouched), so
+            callers need not read the file again to hash it. Its state is
+            undefined if FAILED is returned.
 
+    Returns:
+        UNCHANGED if the file already had this header, UPDATED if it was
+        rewritten, FAILED otherwise
+    """
+    if optimize:
+        return inject_header_into_file_optimized(file_path, header_html, timings,
+                                                 digest)
+    timings = {} if timings is None else timings
+    if isinstance(header_html, str):
+        header_bytes = header_html.encode('utf-8')
+    else:
+        header_bytes = header_html
+    new_span = b'\n' + header_bytes
 
-def process_version_directory(version_dir, header_html):
+    start = time.perf_counter()
+    try:
+        with open(file_path, 'rb') as src:
+            prefix, span_start, span_end = locate_header_span(src)
+            start = record_timing(timings, 'read', start)
+            timings['bytes_in'] = timings.get('bytes_in', 0) + len(prefix)
+            if span_start is None:
+                print(f"  Warning: No <body> tag found in {file_path}",
+                      file=sys.stderr)
+                return FAILED
+            if span_end is not None:
+                unchanged = prefix[span_start:span_end] == new_span
+                start = record_timing(timings, 'splice', start)
+                if unchanged:
+                    if digest is not None:
+                        digest.update(prefix)
+                        for chunk in iter(lambda: src.read(COPY_CHUNK_SIZE), b''):
+                            digest.update(chunk)
+                            timings['bytes_in'] += len(chunk)
+                        record_timing(timings, 'read', start)
+                    return UNCHANGED
+                try:
+                    with atomic_writer(file_path) as dst:
+                        view = memoryview(prefix)
+                        for part in (view[:span_start], new_span, view[span_end:]):
+                            dst.write(part)
+                            if digest is not None:
+                                digest.update(part)
+                        for chunk in iter(lambda: src.read(COPY_CHUNK_SIZE), b''):
+                            dst.write(chunk)
+                            if digest is not None:
+                                digest.update(chunk)
+                        written = dst.tell()
+                    timings['bytes_out'] = timings.get('bytes_out', 0) + written
+                    timings['bytes_in'] += (written - len(prefix)
+                                            - len(new_span) + span_end - span_start)
+                    return UPDATED
+                except Exception as e:
+                    print(f"  Error writing {file_path}: {e}", file=sys.stderr)
+                    return FAILED
+                finally:
+                    record_timing(timings, 'write', start)
+    except Exception as e:
+        print(f"  Error reading {file_path}: {e}", file=sys.stderr)
+        return FAILED
+
+    return inject_header_into_file_regex(file_path, header_bytes.decode('utf-8'),
+                                         timings, digest)
+
+
+def inject_file_batch(file_paths, header_html, entries, collect_stats=False,
+                      optimize=False):
+    """
+    Inject one header into a batch of files.
+
+    This is the unit of work handed to pool workers, so it only takes and
+    returns picklable values.
+
+    Args:
+        file_paths: List of HTML file paths (str)
+        header_html: The header HTML to inject (str or UTF-8 bytes)
+        entries: List of manifest entries (or None) aligned with file_paths;
+            files matching their entry are skipped
+        collect_stats: Whether to record per-file timings and byte counts
+        optimize: Whether to optimize the pages too (see optimize_html)
+
+    Returns:
+        Tuple of (results, elapsed_seconds, file_stats, bytes_saved), where
+        results is a list of (file_path, status, new_entry) tuples; status
+        is UNCHANGED, UPDATED or FAILED, and new_entry is the file's fresh
+        manifest entry, or None when the stored entry is still valid or
+        injection failed. file_stats is empty unless collect_stats is set,
+        in which case it holds one dict per file (see
+        ``file_stats_record``). bytes_saved is the number of bytes
+        optimizing removed from the pages.
+    """
+    start = time.perf_counter()
+    if isinstance(header_html, str):
+        header_bytes = header_html.encode('utf-8')
+    else:
+        header_bytes = header_html
+    header_digest = injection_digest(header_bytes, optimize)
+    results = []
+    file_stats = []
+    bytes_saved = 0
+    for file_path, entry in zip(file_paths, entries):
+        timings = {}
+        file_start = time.perf_counter()
+        status = None
+        new_entry = None
+        if entry and entry.get('header') == header_digest:
+            try:
+                data = Path(file_path).read_bytes()
+            except OSError:
+                data = None
+            if data is not None:
+                timings['bytes_in'] = len(data)
+                if content_digest(data) == entry.get('content'):
+                    status = UNCHANGED
+            record_timing(timings, 'manifest', file_start)
+        if status is None:
+            # hash the page as it is written rather than reading it again
+            digest = hashlib.sha256()
+            status = inject_header_into_file(file_path, header_bytes, timings,
+                                             optimize, digest)
+            bytes_saved += timings.get('bytes_saved', 0)
+            if status != FAILED:
+                new_entry = {
+                    'content': digest.hexdigest(),
+                    'header': header_digest,
+                }
+        results.append((file_path, status, new_entry))
+        if collect_stats:
+            file_stats.append(file_stats_record(
+                file_path, status, time.perf_counter() - file_start, timings
+            ))
+    return results, time.perf_counter() - start, file_stats, bytes_saved
+
+
+def file_stats_record(file_path, status, seconds, timings):
+    """
+    Per-file instrumentation record, as written to the --stats file.
+
+    Phases are 'manifest' (reading and hashing the file for the manifest
+    check), 'read', 'splice', 'optimize' and 'write' (see
+    inject_header_into_file); the file's new manifest entry is hashed while
+    it is read or written.
+    """
+    record = {
+        'type': 'file',
+        'path': str(file_path),
+        'status': status,
+        'seconds': round(seconds, 6),
+        'bytes_in': timings.get('bytes_in', 0),
+        'bytes_out': timings.get('bytes_out', 0),
+    }
+    for phase in FILE_PHASES:
+        record[phase] = round(timings.get(phase, 0.0), 6)
+    return record
+
+
+def process_version_directory(version_dir, header_html, manifest=None,
+                              docs_root=None):
     """
     Process all HTML files in a version directory.
 
+    When a manifest is given, files whose content and header hashes match
+    their manifest entry are skipped, and entries of injected files are
+    updated in place.
+
     Args:
         version_dir: Path to the version directory
         header_html: The header HTML to inject
+        manifest: Optional manifest dict (see ``load_manifest``)
+        docs_root: Docs root the manifest keys are relative to
+
+    Returns:
+        Tuple of (updated_count, unchanged_count, total_count); files that
+        are neither updated nor unchanged failed
+    """
+    html_files = [str(f) for f in Path(version_dir).rglob('*.html')]
+    if manifest is None:
+        entries = [None] * len(html_files)
+    else:
+        entries = [manifest.get(manifest_key(f, docs_root)) for f in html_files]
+
+    results, _, _, _ = inject_file_batch(html_files, header_html, entries)
+
+    updated_count = 0
+    unchanged_count = 0
+    for file_path, status, new_entry in results:
+        updated_count += status == UPDATED
+        unchanged_count += status == UNCHANGED
+        if manifest is not None and new_entry is not None:
+            manifest[manifest_key(file_path, docs_root)] = new_entry
+
+    return updated_count, unchanged_count, len(html_files)
+
+
+def count_pending_files(directory, header_html, manifest, docs_root,
+                        html_files=None, optimize=False):
+    """
+    Return (pending_count, total_count) of HTML files needing injection.
+
+    html_files limits the check to the given files (default: every HTML
+    file under directory).
+    """
+    if html_files is None:
+        html_files = list(Path(directory).rglob('*.html'))
+    header_digest = injection_digest(header_html, optimize)
+    pending = sum(
+        1 for html_file in html_files
+        if not is_up_to_date(html_file, header_digest, manifest, docs_root)
+    )
+    return pending, len(html_files)
+
+
+def git_changed_paths(docs_root, ref):
+    """
+    List paths under docs_root that differ from the git revision ref.
+
+    Covers files changed or deleted since ref (committed or not) and new
+    untracked files.
+
+    Returns:
+        List of paths relative to docs_root (POSIX strings)
+    """
+    commands = [
+        ['git', 'diff', '--name-only', '--no-renames', '--relative', ref, '--', '.'],
+        ['git', 'ls-files', '--others', '--exclude-standard', '--', '.'],
+    ]
+    paths = []
+    for command in commands:
+        result = subprocess.run(command, cwd=docs_root, capture_output=True,
+                                text=True)
+        if result.returncode != 0:
+            raise ValueError(f"{' '.join(command)} failed: {result.stderr.strip()}")
+        paths.extend(line for line in result.stdout.splitlines() if line)
+    return paths
+
+
+def select_changed_files(plan, docs_root, changed_keys, stored_targets,
+                         optimize=False):
+    """
+    Narrow the plan's targets down to the files a change set can affect.
+
+    A target whose header differs from the one recorded in the manifest
+    (because the project list, special links, header options, version list
+    or template changed) is re-injected in full. Otherwise only its HTML
+    files at or under a changed path are processed.
+
+    Args:
+        plan: Injection plan (see build_injection_plan)
+        docs_root: Path to the docs/ directory
+        changed_keys: Changed paths relative to docs_root (POSIX strings)
+        stored_targets: Target header digests from the manifest
+        optimize: Whether pages are optimized (see injection_digest)
+
+    Returns:
+        Dict mapping each target directory (str) to the list of HTML files
+        to process, or None where the whole directory needs re-injection
+    """
+    changed_keys = sorted({key.strip('/') for key in changed_keys})
+    selection = {}
+    for project in plan:
+        for _, directory, header_html in project['targets']:
+            target_key = manifest_key(directory, docs_root)
+            if stored_targets.get(target_key) != injection_digest(header_html, optimize):
+                selection[str(directory)] = None
+                continue
+            files = set()
+            for key in changed_keys:
+                # a change at or above the target covers all of it
+                if (key in ('', '.', target_key)
+                        or target_key.startswith(key + '/')):
+                    files = None
+                    break
+                if not key.startswith(target_key + '/'):
+                    continue
+                path = Path(docs_root) / key
+                if path.is_dir():
+                    files.update(str(f) for f in path.rglob('*.html'))
+                elif path.suffix == '.html' and path.is_file():
+                    files.add(str(path))
+            selection[str(directory)] = None if files is None else sorted(files)
+    return selection
+
+
+def build_injection_plan(docs_root, projects, base_url, project_dirs,
+                         header_options=None, timings=None):
+    """
+    Work out, once, every directory to inject and the header it gets.
+
+    Args:
+        docs_root: Path to the docs/ directory
+        projects: Dict of all projects in the hub (from discover_projects)
+        base_url: Base URL for the documentation hub
+        project_dirs: Dict mapping the names of the projects to process to
+            their directories
+        header_options: Dict of extra keyword arguments for generate_header
+            (``stylesheet_url``, ``versions_json``)
+        timings: Optional dict accumulating seconds spent on version
+            'discovery' and header 'render'ing
+
+    Returns:
+        List of per-project dicts with keys ``name``, ``directory``,
+        ``versions`` (empty for non-versioned projects) and ``targets``, a
+        list of (label, directory, header_html) tuples, with header_html
+        pre-encoded as UTF-8 bytes
+    """
+    header_options = header_options or {}
+    timings = {} if timings is None else timings
+    plan = []
+    for project_name, project_dir in project_dirs.items():
+        project_dir = Path(project_dir)
+        is_versioned = project_name in VERSIONED_PROJECTS
+        start = time.perf_counter()
+        versions = discover_versions(project_dir) if is_versioned else []
+        start = record_timing(timings, 'discovery', start)
+
+        targets = []
+        if is_versioned:
+            for version in versions:
+                header_html = generate_header_bytes(
+                    project_name, version, versions, projects, base_url,
+                    is_versioned=True, **header_options
+                )
+                targets.append((version, project_dir / version, header_html))
+        else:
+            header_html = generate_header_bytes(
+                project_name, None, [], projects, base_url, is_versioned=False,
+                **header_options
+            )
+            targets.append((project_name, project_dir, header_html))
+        record_timing(timings, 'render', start)
+
+        plan.append({
+            'name': project_name,
+            'directory': project_dir,
+            'versions': versions,
+            'targets': targets,
+        })
+    return plan
+
+
+def write_version_redirect(project_dir, versions, dry_run=False):
+    """Write the project root index.html redirecting to the newest version."""
+    # Filter out 'latest' to get actual version numbers
+    version_numbers = [v for v in versions if v != 'latest']
+    if not version_numbers:
+        return
+    highest_version = version_numbers[0]
+
+    if dry_run:
+        print(f"  Would create index.html redirect to {highest_version}")
+        return
+
+    redirect_html = f'''<!DOCTYPE html>
+<html>
+<head>
+    <title>Redirecting to latest version...</title>
+    <meta http-equiv="refresh" content="0;url={highest_version}/" />
+    <link rel="canonical" href="{highest_version}/" />
+</head>
+<body>
+    <p>Redirecting to <a href="{highest_version}/">version {highest_version}</a>.</p>
+</body>
+</html>
+'''
+    index_path = Path(project_dir) / 'index.html'
+    try:
+        if index_path.read_text() == redirect_html:
+            return
+    except FileNotFoundError:
+        pass
+    index_path.write_text(redirect_html)
+    print(f"  Created index.html redirect to {highest_version}")
+
+
+def execute_plan(plan, manifest, docs_root, jobs, file_stats=None,
+                 target_files=None, optimize=False):
+    """
+    Inject headers for every target in the plan, spread across workers.
+
+    Files are split into batches of ``BATCH_SIZE`` sharing one header and
+    handed to a process pool of ``jobs`` workers (in-process when jobs is 1).
+    The manifest is updated in place from the workers' results. If a
+    file_stats list is given, per-file instrumentation records (tagged with
+    their 'project') are appended to it. target_files (see
+    select_changed_files) limits each target to the listed files; targets
+    mapped to None or missing from it are processed in full. optimize
+    optimizes the pages while injecting (see optimize_html).
 
     Returns:
-        Tuple of (success_count, total_count)
+        Dict mapping project names to stats dicts with keys ``files``,
+        ``seconds`` (summed worker time), ``bytes_saved`` (by optimizing)
+        and one count per result status (UPDATED, UNCHANGED, FAILED)
+    """
+    batches = []
+    stats = {}
+    for project in plan:
+        stats[project['name']] = {
+            'files': 0, 'seconds': 0.0, 'bytes_saved': 0,
+            UPDATED: 0, UNCHANGED: 0, FAILED: 0,
+        }
+        for _, directory, header_html in project['targets']:
+            html_files = (target_files or {}).get(str(directory))
+            if html_files is None:
+                html_files = [str(f) for f in Path(directory).rglob('*.html')]
+            stats[project['name']]['files'] += len(html_files)
+            for i in range(0, len(html_files), BATCH_SIZE):
+                chunk = html_files[i:i + BATCH_SIZE]
+                entries = [manifest.get(manifest_key(f, docs_root)) for f in chunk]
+                batches.append((project['name'], chunk, header_html, entries))
+
+    collect_stats = file_stats is not None
+
+    def collect(project_name, results, elapsed, batch_stats, bytes_saved):
+        project_stats = stats[project_name]
+        project_stats['seconds'] += elapsed
+        project_stats['bytes_saved'] += bytes_saved
+        for file_path, status, new_entry in results:
+            project_stats[status] += 1
+            if new_entry is not None:
+                manifest[manifest_key(file_path, docs_root)] = new_entry
+        for record in batch_stats:
+            record['project'] = project_name
+            file_stats.append(record)
+
+    if jobs <= 1 or len(batches) <= 1:
+        for project_name, chunk, header_html, entries in batches:
+            collect(project_name, *inject_file_batch(chunk, header_html, entries,
+                                                     collect_stats, optimize))
+        return stats
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {
+            pool.submit(inject_file_batch, chunk, header_html, entries,
+                        collect_stats, optimize): project_name
+            for project_name, chunk, header_html, entries in batches
+        }
+        for future in as_completed(futures):
+            collect(futures[future], *future.result())
+    return stats
+
+
+def build_stats_records(phases, plan, stats, file_stats, jobs):
     """
-    version_path = Path(version_dir)
-    html_files = list(version_path.rglob('*.html'))
+    Assemble the --stats output: a 'run' record, one 'project' record per
+    project, then one 'file' record per file.
 
-    success_count = 0
-    for html_file in html_files:
-        if inject_header_into_file(html_file, header_html):
-            success_count += 1
+    Args:
+        phases: Dict of wall-clock seconds per run phase
+        plan: The executed injection plan
+        stats: Per-project stats returned by execute_plan
+        file_stats: Per-file records collected by execute_plan
+        jobs: Number of worker processes used
 
-    return success_count, len(html_files)
+    Returns:
+        List of JSON-serializable dicts
+    """
+    by_project = {}
+    for record in file_stats:
+        io = by_project.setdefault(record['project'], {'bytes_in': 0, 'bytes_out': 0})
+        io['bytes_in'] += record['bytes_in']
+        io['bytes_out'] += record['bytes_out']
+
+    project_records = []
+    for project in plan:
+        project_stats = stats[project['name']]
+        project_records.append({
+            'type': 'project',
+            'project': project['name'],
+            'files': project_stats['files'],
+            UPDATED: project_stats[UPDATED],
+            UNCHANGED: project_stats[UNCHANGED],
+            FAILED: project_stats[FAILED],
+            'seconds': round(project_stats['seconds'], 6),
+            'bytes_saved': project_stats['bytes_saved'],
+            **by_project.get(project['name'], {'bytes_in': 0, 'bytes_out': 0}),
+        })
+
+    slowest = sorted(file_stats, key=lambda r: r['seconds'], reverse=True)
+    run_record = {
+        'type': 'run',
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'jobs': jobs,
+        'files': len(file_stats),
+        **{status: sum(r[status] for r in project_records)
+           for status in (UPDATED, UNCHANGED, FAILED)},
+        'bytes_in': sum(r['bytes_in'] for r in file_stats),
+        'bytes_out': sum(r['bytes_out'] for r in file_stats),
+        'phases': {phase: round(seconds, 6) for phase, seconds in phases.items()},
+        'file_phases': {
+            phase: round(sum(r[phase] for r in file_stats), 6)
+            for phase in FILE_PHASES
+        },
+        'slowest': [
+            {'path': r['path'], 'seconds': r['seconds'], 'status': r['status']}
+            for r in slowest[:STATS_SLOWEST_FILES]
+        ],
+    }
+    return [run_record] + project_records + sorted(file_stats, key=lambda r: r['path'])
+
+
+def write_stats(stats_path, records):
+    """Write instrumentation records to stats_path as JSON lines."""
+    with open(stats_path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+
+
+def print_stats_summary(run_record):
+    """Print the phase timings, I/O totals and slowest files of a run."""
+    def mib(size):
+        return f"{size / (1024 * 1024):.1f} MiB"
+
+    print("\nTimings (wall clock):")
+    for phase, seconds in run_record['phases'].items():
+        print(f"  {phase:<12} {seconds:8.3f}s")
+    print("Per-file phases (summed over workers):")
+    for phase, seconds in run_record['file_phases'].items():
+        print(f"  {phase:<12} {seconds:8.3f}s")
+    print(f"I/O: {mib(run_record['bytes_in'])} read, "
+          f"{mib(run_record['bytes_out'])} written")
+    if run_record['slowest']:
+        print("Slowest files:")
+        for record in run_record['slowest']:
+            print(f"  {record['seconds'] * 1000:8.1f}ms  {record['path']} "
+                  f"({record['status']})")
 
 
 def main():
@@ -554,7 +1822,13 @@ def main():
     )
     parser.add_argument(
         'project_dir',
-        help='Path to project documentation directory (e.g., docs/mmif-python/)'
+        help='Path to project documentation directory (e.g., docs/mmif-python/), '
+             'or to the docs root when --all is given'
+    )
+    parser.add_argument(
+        '--all',
+        action='store_true',
+        help='Treat project_dir as the docs root and process every project in it'
     )
     parser.add_argument(
         '--base-url',
@@ -565,126 +1839,259 @@ def main():
         '--project-name',
         help='Project name to display (default: derived from directory name)'
     )
+    parser.add_argument(
+        '--external-css',
+        action='store_true',
+        help='Link a shared, content-hashed header stylesheet under '
+             f'{HEADER_STYLESHEET_DIR}/ instead of inlining the CSS in every page'
+    )
+    parser.add_argument(
+        '--versions-json',
+        action='store_true',
+        help=f'Write a {VERSIONS_JSON_FILENAME} per versioned project and fill '
+             'the version selector from it at runtime instead of baking in '
+             'every version'
+    )
+    parser.add_argument(
+        '--prefetch',
+        action='store_true',
+        help='Add speculation rules to the header so browsers prefetch the '
+             'project links and the previous/next pages on hover'
+    )
+    parser.add_argument(
+        '--optimize',
+        action='store_true',
+        help='Also minify whitespace, lazy-load images and defer scripts where '
+             'safe, in the same read and write of each page'
+    )
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=os.cpu_count() or 1,
+        help='Number of worker processes (default: number of CPUs)'
+    )
     parser.add_argument(
         '--dry-run',
         action='store_true',
         help='Show what would be done without making changes'
     )
+    parser.add_argument(
+        '--manifest',
+        help=f'Path to the injection manifest '
+             f'(default: {MANIFEST_FILENAME} in the docs root)'
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Re-inject every file, ignoring the manifest (it is still updated)'
+    )
+    parser.add_argument(
+        '--stats',
+        metavar='FILE',
+        help='Write per-phase timings, per-file latency and byte counts to '
+             'FILE as JSON lines'
+    )
+    parser.add_argument(
+        '--stats-summary',
+        action='store_true',
+        help='Print per-phase timings, I/O totals and the slowest files'
+    )
+    change_set = parser.add_mutually_exclusive_group()
+    change_set.add_argument(
+        '--changed',
+        nargs='+',
+        metavar='PATH',
+        help='Only re-inject pages at or under these paths (plus whole '
+             'directories whose header changed, e.g. after a project was added)'
+    )
+    change_set.add_argument(
+        '--since',
+        metavar='REF',
+        help='Like --changed, with the paths that differ from git revision REF '
+             '(including untracked files)'
+    )
 
     args = parser.parse_args()
 
-    project_dir = Path(args.project_dir)
-
-    # Derive project name from directory if not specified
-    project_name = args.project_name or project_dir.name
+    if args.all:
+        docs_root = Path(args.project_dir)
+        if args.project_name:
+            parser.error('--project-name cannot be combined with --all')
+    else:
+        project_dir = Path(args.project_dir)
+        # Derive project name from directory if not specified
+        project_name = args.project_name or project_dir.name
+        # Determine docs root (parent of project directory)
+        docs_root = project_dir.parent
 
-    # Determine docs root (parent of project directory)
-    docs_root = project_dir.parent
+    # Wall-clock seconds per phase, reported with --stats/--stats-summary
+    phases = {}
+    run_start = time.perf_counter()
 
     # Discover all projects in the hub
     projects = discover_projects(docs_root)
+    record_timing(phases, 'discovery', run_start)
     if projects:
         print(f"Found projects: {', '.join(sorted(projects.keys()))}")
+    elif args.all:
+        print(f"Error: No projects found in {docs_root}", file=sys.stderr)
+        sys.exit(1)
     else:
         print("Warning: No projects found in docs/", file=sys.stderr)
         projects = {project_name: {'is_versioned': False}}
 
-    # Discover versions for this project (only if in VERSIONED_PROJECTS)
-    is_versioned = project_name in VERSIONED_PROJECTS
-    versions = []
-    if is_versioned:
-        print(f"Scanning {project_dir} for versions...")
-        try:
-            versions = discover_versions(project_dir)
-        except ValueError as e:
-            print(f"Error: {e}", file=sys.stderr)
-            sys.exit(1)
+    if args.all:
+        project_dirs = {name: docs_root / name for name in sorted(projects)}
+    else:
+        project_dirs = {project_name: project_dir}
+
+    header_options = {'versions_json': args.versions_json,
+                      'prefetch': args.prefetch,
+                      'logo_path': header_logo_path(docs_root)}
+    if args.external_css:
+        stylesheet_path = f"{HEADER_STYLESHEET_DIR}/{header_stylesheet_name()}"
+        if not args.dry_run:
+            stylesheet_path = write_header_stylesheet(docs_root)
+        header_options['stylesheet_url'] = f"{args.base_url}/{stylesheet_path}"
+
+    # Discover versions and render every header up front
+    try:
+        plan = build_injection_plan(docs_root, projects, args.base_url,
+                                    project_dirs, header_options, phases)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    # Load the manifest of previously injected files
+    manifest_path = Path(args.manifest) if args.manifest else docs_root / MANIFEST_FILENAME
+    stored_manifest = load_manifest(manifest_path)
+    stored_targets = load_manifest(manifest_path, 'targets')
+    manifest = dict(stored_manifest)
+    if args.force:
+        # keep entries of other projects; ours are all rewritten below
+        prefixes = tuple(
+            manifest_key(d, docs_root) + '/' for d in project_dirs.values()
+        )
+        manifest = {k: v for k, v in stored_manifest.items()
+                    if not k.startswith(prefixes)}
+
+    # Limit injection to a change set, if one is given
+    changed_keys = None
+    target_files = None
+    if args.changed or args.since:
+        if args.since:
+            try:
+                changed_keys = git_changed_paths(docs_root, args.since)
+            except (OSError, ValueError) as e:
+                print(f"Error: {e}", file=sys.stderr)
+                sys.exit(1)
+        else:
+            changed_keys = []
+            for path in args.changed:
+                try:
+                    changed_keys.append(
+                        manifest_key(Path(path).resolve(), docs_root.resolve())
+                    )
+                except ValueError:
+                    print(f"  Warning: Ignoring {path}, which is outside {docs_root}",
+                          file=sys.stderr)
+        target_files = select_changed_files(
+            plan, docs_root, changed_keys, {} if args.force else stored_targets,
+            args.optimize
+        )
+        full = [d for d, files in target_files.items() if files is None]
+        print(f"Change set: {len(changed_keys)} path(s); {len(full)} of "
+              f"{len(target_files)} directories need full re-injection")
 
     if args.dry_run:
         print("\nDry run mode - no changes will be made\n")
-
-    total_success = 0
-    total_files = 0
-
-    if is_versioned:
-        # Versioned project: process each version directory
-        print(f"Found {len(versions)} versions: {', '.join(versions)}")
-
-        for version in versions:
-            version_dir = project_dir / version
-
-            # Generate header for this specific version
-            header_html = generate_header(
-                project_name,
-                version,
-                versions,
-                projects,
-                args.base_url,
-                is_versioned=True
-            )
-
-            if args.dry_run:
-                html_count = len(list(version_dir.rglob('*.html')))
-                print(f"  {version}: would inject into {html_count} files")
+        total_files = 0
+        for project in plan:
+            if project['versions']:
+                print(f"{project['name']}: {len(project['versions'])} versions: "
+                      f"{', '.join(project['versions'])}")
+            for label, directory, header_html in project['targets']:
+                pending, html_count = count_pending_files(
+                    directory, header_html, manifest, docs_root,
+                    (target_files or {}).get(str(directory)), args.optimize
+                )
+                print(f"  {label}: would inject into {pending}/{html_count} files")
                 total_files += html_count
-            else:
-                print(f"Processing {version}...")
-                success, total = process_version_directory(version_dir, header_html)
-                print(f"  Injected header into {success}/{total} files")
-                total_success += success
-                total_files += total
-
-        # Generate root index.html redirect to latest version
-        if versions:
-            # Filter out 'latest' to get actual version numbers
-            version_numbers = [v for v in versions if v != 'latest']
-            if version_numbers:
-                highest_version = version_numbers[0]
-
-                if args.dry_run:
-                    print(f"  Would create index.html redirect to {highest_version}")
-                else:
-                    redirect_html = f'''<!DOCTYPE html>
-<html>
-<head>
-    <title>Redirecting to latest version...</title>
-    <meta http-equiv="refresh" content="0;url={highest_version}/" />
-    <link rel="canonical" href="{highest_version}/" />
-</head>
-<body>
-    <p>Redirecting to <a href="{highest_version}/">version {highest_version}</a>.</p>
-</body>
-</html>
-'''
-                    (project_dir / 'index.html').write_text(redirect_html)
-                    print(f"  Created index.html redirect to {highest_version}")
-    else:
-        # Non-versioned project: process the directory itself
-        print("No version directories found - treating as non-versioned project")
-
-        # Generate header without version selector
-        header_html = generate_header(
-            project_name,
-            None,
-            [],
-            projects,
-            args.base_url,
-            is_versioned=False
-        )
-
-        if args.dry_run:
-            html_count = len(list(project_dir.rglob('*.html')))
-            print(f"  Would inject into {html_count} files")
-            total_files += html_count
-        else:
-            print(f"Processing {project_name}...")
-            success, total = process_version_directory(project_dir, header_html)
-            print(f"  Injected header into {success}/{total} files")
-            total_success += success
-            total_files += total
+            if project['versions']:
+                write_version_redirect(project['directory'], project['versions'],
+                                       dry_run=True)
+                if args.versions_json:
+                    write_versions_json(project['directory'], project['versions'],
+                                        args.base_url, project['name'],
+                                        dry_run=True)
+        print(f"\nComplete: {total_files} files checked")
+        return
+
+    jobs = max(1, args.jobs)
+    collect_stats = bool(args.stats or args.stats_summary)
+    file_stats = [] if collect_stats else None
+    print(f"Processing {len(plan)} project(s) with {jobs} worker(s)...")
+    start = time.perf_counter()
+    stats = execute_plan(plan, manifest, docs_root, jobs, file_stats,
+                         target_files, args.optimize)
+    start = record_timing(phases, 'inject', start)
+    wall_seconds = phases['inject']
+
+    totals = {'files': 0, 'bytes_saved': 0, UPDATED: 0, UNCHANGED: 0, FAILED: 0}
+    for project in plan:
+        project_stats = stats[project['name']]
+        print(f"  {project['name']}: {project_stats['files']} files, "
+              f"{project_stats[UPDATED]} updated, "
+              f"{project_stats[UNCHANGED]} unchanged, "
+              f"{project_stats[FAILED]} failed "
+              f"in {project_stats['seconds']:.2f}s"
+              + (f", {project_stats['bytes_saved'] / 1024:.1f} KiB saved by optimizing"
+                 if args.optimize else ''))
+        if project['versions']:
+            write_version_redirect(project['directory'], project['versions'])
+            if args.versions_json:
+                write_versions_json(project['directory'], project['versions'],
+                                    args.base_url, project['name'])
+        for key in totals:
+            totals[key] += project_stats[key]
+
+    # Record the header of every directory injected without failures
+    targets = dict(stored_targets)
+    for project in plan:
+        if stats[project['name']][FAILED]:
+            continue
+        for _, directory, header_html in project['targets']:
+            targets[manifest_key(directory, docs_root)] = injection_digest(
+                header_html, args.optimize)
+    targets = {key: digest for key, digest in targets.items()
+               if (docs_root / key).is_dir()}
+
+    # With a change set, only paths in it can have lost files
+    prune_roots = (project_dirs.values() if changed_keys is None
+                   else [docs_root / key for key in changed_keys])
+    for prune_root in prune_roots:
+        removed = prune_manifest(manifest, prune_root, docs_root)
+        if removed:
+            print(f"  Dropped {removed} stale manifest entries under {prune_root}")
+    if manifest != stored_manifest or targets != stored_targets:
+        save_manifest(manifest_path, manifest, targets)
+    record_timing(phases, 'finalize', start)
+    phases['total'] = time.perf_counter() - run_start
 
     # Summary
-    print(f"\nComplete: {total_success}/{total_files} files processed")
+    print(f"\nComplete: {totals[UPDATED]}/{totals['files']} files updated, "
+          f"{totals[UNCHANGED]} unchanged, {totals[FAILED]} failed "
+          f"in {wall_seconds:.2f}s")
+    if args.optimize:
+        print(f"Optimizing saved {totals['bytes_saved'] / (1024 * 1024):.1f} MiB")
+
+    if collect_stats:
+        records = build_stats_records(phases, plan, stats, file_stats, jobs)
+        if args.stats_summary:
+            print_stats_summary(records[0])
+        if args.stats:
+            write_stats(args.stats, records)
+            print(f"Wrote instrumentation for {len(file_stats)} files to {args.stats}")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Merge the hub's Sphinx ``objects.inv`` files into local intersphinx inventories.
+
+Every project (and every version of a versioned project) publishes an
+``objects.inv``. This script decodes all of them and writes, under
+``docs/assets/inventory/``:
+
+- ``<project>.inv``: the inventory of each project's newest version, for
+  intersphinx to read locally instead of fetching it over the network
+- ``hub.inv``: one inventory of every object in the hub, with URIs relative
+  to the hub root; each object points to the newest version defining it,
+  so objects removed in later releases still resolve to older ones
+- ``index.json``: a prebuilt lookup index with, per project, the newest
+  version and its inventory file, and per ``domain:role`` and object name,
+  the project, URI and display name from ``hub.inv``
+
+``documentation/conf.py`` reads index.json and points intersphinx at the
+local inventories when they exist.
+
+Usage:
+    python build-tools/inventory.py docs/
+"""
+
+import argparse
+import json
+import re
+import sys
+import zlib
+from pathlib import Path
+
+import hublib
+
+
+# Output directory, relative to the docs root
+INVENTORY_DIR = 'assets/inventory'
+
+INDEX_FORMAT_VERSION = 1
+
+INVENTORY_HEADER = '# Sphinx inventory version 2\n'
+
+# One object per line: name, domain:role, priority, URI, display name
+# (the same pattern Sphinx uses to read inventories)
+INVENTORY_LINE_PATTERN = re.compile(r'(.+?)\s+(\S+)\s+(-?\d+)\s+?(\S*)\s+(.*)')
+
+
+def read_inventory(path):
+    """
+    Decode a version 2 Sphinx inventory.
+
+    Returns:
+        List of (name, type, priority, uri, dispname) tuples, where type is
+        ``domain:role``; '$' and '-' shorthands are kept as written
+    """
+    data = Path(path).read_bytes()
+    offset = 0
+    for _ in range(4):
+        offset = data.index(b'\n', offset) + 1
+    header = data[:offset].decode('utf-8')
+    if not header.startswith(INVENTORY_HEADER):
+        raise ValueError(f"unsupported inventory format: {header.splitlines()[0]}")
+
+    objects = []
+    for line in zlib.decompress(data[offset:]).decode('utf-8').splitlines():
+        match = INVENTORY_LINE_PATTERN.match(line.rstrip())
+        if match:
+            objects.append(match.groups())
+    return objects
+
+
+def encode_inventory(project, version, objects):
+    """Encode objects (as from read_inventory) as a version 2 inventory."""
+    header = (
+        INVENTORY_HEADER
+        + f'# Project: {project}\n'
+        + f'# Version: {version}\n'
+        + '# The remainder of this file is compressed using zlib.\n'
+    )
+    body = ''.join(' '.join(obj) + '\n' for obj in objects)
+    return header.encode('utf-8') + zlib.compress(body.encode('utf-8'), 9)
+
+
+def find_inventories(docs_root):
+    """
+    Find every project's inventories, newest version first.
+
+    Returns:
+        Dict mapping project names to lists of (version, site_prefix, path)
+        tuples; version is None and site_prefix ``<project>/`` for
+        unversioned projects, otherwise site_prefix is
+        ``<project>/<version>/``
+    """
+    ih = hublib.load_inject_header()
+    inventories = {}
+    for name, info in sorted(ih.discover_projects(docs_root).items()):
+        project_dir = Path(docs_root) / name
+        if info['is_versioned']:
+            sites = [(v, f'{name}/{v}/') for v in ih.discover_versions(project_dir)]
+        else:
+            sites = [(None, f'{name}/')]
+        found = [
+            (version, prefix, Path(docs_root) / prefix / 'objects.inv')
+            for version, prefix in sites
+            if (Path(docs_root) / prefix / 'objects.inv').is_file()
+        ]
+        if found:
+            inventories[name] = found
+    return inventories
+
+
+def merge_inventories(inventories):
+    """
+    Merge every inventory into hub-wide objects.
+
+    Objects are taken from the newest version defining them; across
+    projects, the first project (alphabetically) wins.
+
+    Returns:
+        Tuple of (objects, skipped): objects is a list of inventory tuples
+        with URIs relative to the hub root; skipped counts unreadable files
+    """
+    merged = {}
+    skipped = 0
+    for project, sites in inventories.items():
+        for _, prefix, path in sites:
+            try:
+                objects = read_inventory(path)
+            except (OSError, ValueError, zlib.error) as e:
+                print(f"  Warning: Skipping unreadable {path}: {e}", file=sys.stderr)
+                skipped += 1
+                continue
+            for name, obj_type, priority, uri, dispname in objects:
+                merged.setdefault(
+                    (obj_type, name),
+                    (name, obj_type, priority, prefix + uri, dispname)
+                )
+    return [merged[key] for key in sorted(merged)], skipped
+
+
+def build_index(inventories, objects):
+    """Build the index.json lookup structure."""
+    projects = {}
+    for project, sites in inventories.items():
+        version, prefix, _ = sites[0]
+        projects[project] = {
+            'version': version,
+            'target': prefix,
+            'inventory': f'{project}.inv',
+            'versions': [v for v, _, _ in sites if v is not None],
+        }
+
+    lookup = {}
+    for name, obj_type, _, uri, dispname in objects:
+        if uri.endswith('$'):
+            uri = uri[:-1] + name
+        project = uri.split('/', 1)[0]
+        lookup.setdefault(obj_type, {})[name] = [
+            project, uri, name if dispname == '-' else dispname
+        ]
+    return {
+        'version': INDEX_FORMAT_VERSION,
+        'projects': projects,
+        'objects': lookup,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Merge the hub\'s objects.inv files into local intersphinx inventories'
+    )
+    parser.add_argument(
+        'docs_root',
+        help='Path to the docs/ directory'
+    )
+    args = parser.parse_args()
+
+    docs_root = Path(args.docs_root)
+    if not docs_root.is_dir():
+        print(f"Error: Directory not found: {docs_root}", file=sys.stderr)
+        sys.exit(1)
+
+    inventories = find_inventories(docs_root)
+    total = sum(len(sites) for sites in inventories.values())
+    print(f"Found {total} inventories in {len(inventories)} projects")
+
+    objects, skipped = merge_inventories(inventories)
+    out_dir = docs_root / INVENTORY_DIR
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    outputs = {
+        'hub.inv': encode_inventory('CLAMS', 'hub', objects),
+        'index.json': (json.dumps(build_index(inventories, objects),
+                                  separators=(',', ':'), sort_keys=True)
+                       .encode('utf-8')),
+    }
+    for project, sites in inventories.items():
+        outputs[f'{project}.inv'] = sites[0][2].read_bytes()
+
+    written = sum(hublib.write_if_changed(out_dir / name, data)
+                  for name, data in outputs.items())
+    for stale in out_dir.glob('*.inv'):
+        if stale.name not in outputs:
+            stale.unlink()
+
+    for project, sites in inventories.items():
+        version = sites[0][0]
+        print(f"  {project}: {len(sites)} inventories"
+              + (f", newest {version}" if version else ""))
+    print(f"\nComplete: {len(objects)} objects merged into {out_dir} "
+          f"({written} files updated, {skipped} inventories skipped)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Recompress PNG images across the docs tree and add WebP variants.
+
+Every PNG under docs/ is re-encoded losslessly (zlib at the highest level,
+with Pillow's PNG optimizer) and replaced when that is smaller. A lossless
+WebP variant is written next to it (``<name>.webp``) when it is smaller
+still, and image ``src`` attributes of HTML pages and ``url(...)``
+references of stylesheets pointing at the PNG are rewritten to the WebP,
+except for PNGs a script of their ``_static/`` tree names (``doctools.js``
+swaps the module index's ``minus.png``/``plus.png`` by name). The PNG stays
+in place for anything else referring to it. Both encodings
+are checked to decode to exactly the original pixels; 16-bit and animated
+PNGs are left alone.
+
+Results are cached by content hash in ``docs/.image-manifest.json``: images
+whose content is already the output of an earlier run are skipped, and a
+copy of an image processed before (e.g. the same theme icon in a freshly
+synced version) reuses the optimized file already in the tree. Identical
+images are processed once per run, spread over a pool of worker processes.
+Savings are reported per image.
+
+Encoding needs the optional ``Pillow`` package (``pip install Pillow``);
+without it, only existing WebP variants are linked.
+
+Usage:
+    python build-tools/optimize-images.py docs/
+    python build-tools/optimize-images.py docs/ --jobs 4 --no-webp
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import hublib
+
+try:
+    from PIL import Image, features
+except ImportError:
+    Image = None
+
+
+MANIFEST_FILENAME = '.image-manifest.json'
+MANIFEST_FORMAT_VERSION = 1
+
+WEBP_SUFFIX = '.webp'
+
+# Number of distinct images handed to a worker process at a time
+BATCH_SIZE = 8
+
+# Offset of the bit depth in a PNG file (signature, IHDR length, type,
+# width, height)
+PNG_BIT_DEPTH_OFFSET = 24
+
+
+def webp_available():
+    """Whether this Pillow build can write WebP."""
+    return Image is not None and features.check('webp')
+
+
+def same_pixels(image, data):
+    """Whether the encoded image data decodes to the pixels of image."""
+    with Image.open(io.BytesIO(data)) as decoded:
+        return (decoded.size == image.size
+                and decoded.convert('RGBA').tobytes() == image.convert('RGBA').tobytes())
+
+
+def optimize_image(data, webp=True):
+    """
+    Losslessly re-encode a PNG.
+
+    Args:
+        data: The PNG file contents
+        webp: Whether to try a lossless WebP encoding too
+
+    Returns:
+        Tuple of (png, webp): the smaller PNG encoding, or None if it is not
+        smaller than data; the WebP encoding, or None if it is not smaller
+        than the smaller PNG
+    """
+    if len(data) > PNG_BIT_DEPTH_OFFSET and data[PNG_BIT_DEPTH_OFFSET] == 16:
+        return None, None  # Pillow reads these as 8 bits per channel
+    with Image.open(io.BytesIO(data)) as image:
+        if getattr(image, 'is_animated', False):
+            return None, None
+        image.load()
+
+        buffer = io.BytesIO()
+        options = {'optimize': True}
+        if 'dpi' in image.info:
+            options['dpi'] = image.info['dpi']
+        image.save(buffer, 'PNG', **options)
+        png = buffer.getvalue()
+        if len(png) >= len(data) or not same_pixels(image, png):
+            png = None
+
+        webp_data = None
+        if webp:
+            buffer = io.BytesIO()
+            image.save(buffer, 'WEBP', lossless=True, quality=100, method=6,
+                       exact=True)
+            webp_data = buffer.getvalue()
+            if (len(webp_data) >= len(png or data)
+                    or not same_pixels(image, webp_data)):
+                webp_data = None
+    return png, webp_data
+
+
+def optimize_batch(tasks, webp):
+    """
+    Optimize a batch of distinct images.
+
+    Args:
+        tasks: List of (digest, path) pairs, one path per distinct image
+        webp: Whether to produce WebP variants
+
+    Returns:
+        List of (digest, png, webp) tuples (see optimize_image); both are
+        None for images that could not be read
+    """
+    results = []
+    for digest, path in tasks:
+        try:
+            png, webp_data = optimize_image(Path(path).read_bytes(), webp)
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            print(f"  Warning: Skipping {path}: {e}", file=sys.stderr)
+            png = webp_data = None
+        results.append((digest, png, webp_data))
+    return results
+
+
+def load_manifest(manifest_path):
+    """
+    Load the image cache.
+
+    Returns:
+        Dict mapping input digests to ``{'png': <output digest>, 'webp':
+        <size or None>}``; the output digest equals the input digest when
+        recompressing did not help. Empty if missing or unreadable.
+    """
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    if data.get('version') != MANIFEST_FORMAT_VERSION:
+        return {}
+    return data.get('images', {})
+
+
+def save_manifest(manifest_path, images):
+    """Write the image cache with entries sorted for stable diffs."""
+    data = {
+        'version': MANIFEST_FORMAT_VERSION,
+        'images': {key: images[key] for key in sorted(images)},
+    }
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=1)
+        f.write('\n')
+
+
+def webp_path(path):
+    """Path of the WebP variant of a PNG."""
+    return Path(path).with_suffix(WEBP_SUFFIX)
+
+
+def rewrite_references(docs_root, variants, atomic_write):
+    """
+    Point image src attributes and stylesheet url()s at WebP variants.
+
+    Args:
+        docs_root: Path to the docs/ directory
+        variants: Set of PNG Paths with a WebP variant
+        atomic_write: Function (path, bytes) replacing a file atomically
+
+    Returns:
+        Number of references rewritten
+    """
+    def webp_url(source, url):
+        target = hublib.resolve_local_reference(source, url)
+        if target not in variants:
+            return None
+        path, suffix = hublib.split_url(url)
+        return path[:-len('.png')] + WEBP_SUFFIX + suffix
+
+    rewritten = 0
+    for page in hublib.iter_project_files(docs_root, {'.html', '.css'}):
+        text = page.read_text(encoding='utf-8', errors='surrogateescape')
+        if '.png' not in text:
+            continue
+        count = 0
+        if page.suffix == '.html':
+            def replace(match):
+                nonlocal count
+                attr, url = match.groups()
+                new_url = (webp_url(page, url)
+                           if attr == 'src' and url.split('?')[0].endswith('.png') else None)
+                if new_url is None:
+                    return match.group(0)
+                count += 1
+                return f'{attr}="{new_url}"'
+            new_text = hublib.HTML_REF_PATTERN.sub(replace, text)
+        else:
+            parts, last = [], 0
+            for start, end in hublib.asset_reference_spans(text, '.css'):
+                new_url = webp_url(page, text[start:end])
+                if new_url is not None:
+                    parts += [text[last:start], new_url]
+                    last = end
+                    count += 1
+            new_text = ''.join(parts) + text[last:]
+        if count:
+            atomic_write(page, new_text.encode('utf-8', errors='surrogateescape'))
+            rewritten += count
+    return rewritten
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Losslessly recompress PNGs in the docs tree and add WebP variants'
+    )
+    parser.add_argument(
+        'docs_root',
+        help='Path to the docs/ directory'
+    )
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=os.cpu_count() or 1,
+        help='Number of worker processes (default: number of CPUs)'
+    )
+    parser.add_argument(
+        '--no-webp',
+        action='store_true',
+        help='Only recompress PNGs; do not write WebP variants'
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Process every image again, ignoring the cache'
+    )
+    args = parser.parse_args()
+
+    docs_root = Path(args.docs_root)
+    if not docs_root.is_dir():
+        print(f"Error: Directory not found: {docs_root}", file=sys.stderr)
+        sys.exit(1)
+
+    ih = hublib.load_inject_header()
+    manifest_path = docs_root / MANIFEST_FILENAME
+    stored = {} if args.force else load_manifest(manifest_path)
+    images = dict(stored)
+    webp = not args.no_webp and webp_available()
+    if Image is None:
+        print("Warning: Pillow is not installed (pip install Pillow); "
+              "only existing WebP variants are linked", file=sys.stderr)
+    elif not webp and not args.no_webp:
+        print("Warning: this Pillow build cannot write WebP; only recompressing PNGs",
+              file=sys.stderr)
+
+    by_digest = defaultdict(list)
+    for path in hublib.iter_project_files(docs_root, {'.png'}):
+        by_digest[hublib.file_digest(path)].append(path)
+    outputs = {entry['png'] for entry in images.values()}
+    print(f"Found {sum(len(p) for p in by_digest.values())} PNGs, "
+          f"{len(by_digest)} distinct")
+
+    # Copies of images optimized before reuse an optimized file in the tree
+    reused = 0
+    saved = 0
+    pending = {}
+    for digest, paths in by_digest.items():
+        if digest in outputs:
+            continue
+        entry = images.get(digest)
+        source = by_digest.get(entry['png'], [None])[0] if entry else None
+        if source is not None and (not entry['webp'] or webp_path(source).is_file()):
+            served = entry['webp'] or source.stat().st_size
+            for path in paths:
+                saved += path.stat().st_size - served
+                ih.write_file_atomically(path, source.read_bytes())
+                if entry['webp']:
+                    ih.write_file_atomically(webp_path(path),
+                                             webp_path(source).read_bytes())
+            reused += len(paths)
+        elif Image is not None:
+            pending[digest] = paths
+
+    tasks = sorted((digest, str(paths[0])) for digest, paths in pending.items())
+    batches = [tasks[i:i + BATCH_SIZE] for i in range(0, len(tasks), BATCH_SIZE)]
+    jobs = max(1, args.jobs)
+    if jobs > 1 and len(batches) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = [r for batch in pool.map(optimize_batch, batches,
+                                               [webp] * len(batches))
+                       for r in batch]
+    else:
+        results = [r for batch in batches for r in optimize_batch(batch, webp)]
+
+    for digest, png, webp_data in sorted(results, key=lambda r: pending[r[0]][0]):
+        paths = pending[digest]
+        size = paths[0].stat().st_size
+        best = len(png) if png else size
+        for path in paths:
+            if png:
+                ih.write_file_atomically(path, png)
+            if webp_data:
+                ih.write_file_atomically(webp_path(path), webp_data)
+        images[digest] = {
+            'png': ih.content_digest(png) if png else digest,
+            'webp': len(webp_data) if webp_data else None,
+        }
+        served = len(webp_data) if webp_data else best
+        saved += (size - served) * len(paths)
+        copies = f" ({len(paths)} copies)" if len(paths) > 1 else ''
+        print(f"  {paths[0].relative_to(docs_root)}{copies}: "
+              f"{hublib.format_bytes(size)} -> PNG {hublib.format_bytes(best)}"
+              + (f", WebP {hublib.format_bytes(len(webp_data))}" if webp_data else '')
+              + f" ({100 * (size - served) / size:.0f}% smaller)")
+
+    # Scripts swapping images by name (the module index togglers of
+    # doctools.js) need their src to keep pointing at the PNG
+    static_files = {
+        path for path in hublib.iter_project_files(docs_root, {'.png', '.js'})
+        if '_static' in path.relative_to(docs_root).parts
+    }
+    named = hublib.named_in_scripts(static_files)
+    variants = {
+        path
+        for digest, paths in by_digest.items()
+        for path in paths
+        if webp_path(path).is_file() and path not in named
+    }
+    rewritten = rewrite_references(docs_root, variants, ih.write_file_atomically)
+
+    if images != stored:
+        save_manifest(manifest_path, images)
+    print(f"\nComplete: {len(results)} images optimized, {reused} copies reused, "
+          f"{hublib.format_bytes(saved)} saved; {rewritten} references "
+          f"now point to {len(variants)} WebP variants")
+
+
+if __name__ == '__main__':
+    main()
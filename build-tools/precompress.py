@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Write precompressed siblings of every compressible file in the docs tree.
+
+For each HTML, JS, CSS, JSON, SVG, XML, source map and text file under
+docs/, ``<file>.gz`` (gzip, level 9) and ``<file>.br`` (brotli, quality 11)
+are written next to it, so a static front end can serve precompressed bytes
+without compressing on every request. A sibling is only kept when it is
+smaller than the source.
+
+Runs are incremental: the source hash of every compressed file is recorded
+in ``docs/.precompress-manifest.json``, and files whose hash is unchanged
+(and whose siblings exist) are skipped. Compression is spread across a pool
+of worker processes.
+
+Brotli output needs the optional ``brotli`` package (``pip install brotli``);
+without it only gzip siblings are written.
+
+Usage:
+    python build-tools/precompress.py docs/
+    python build-tools/precompress.py docs/ --jobs 4
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import hublib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Suffixes of files worth compressing
+COMPRESSIBLE_SUFFIXES = {
+    '.html', '.js', '.css', '.json', '.svg', '.xml', '.map', '.txt',
+}
+
+# Files smaller than this are not worth a compressed sibling
+MIN_SIZE = 1024
+
+MANIFEST_FILENAME = '.precompress-manifest.json'
+
+# Number of files handed to a worker process at a time
+BATCH_SIZE = 64
+
+
+def available_formats():
+    """Sibling suffixes that can be produced in this environment."""
+    return ('.gz', '.br') if brotli is not None else ('.gz',)
+
+
+def compress(data, fmt):
+    """Compress data (bytes) into the given sibling format."""
+    if fmt == '.gz':
+        # mtime=0 keeps the output identical for identical input
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    return brotli.compress(data, quality=11)
+
+
+def find_sources(docs_root):
+    """Yield every compressible file under docs_root (hidden files excluded)."""
+    for dirpath, dirnames, filenames in os.walk(docs_root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+        for filename in sorted(filenames):
+            path = Path(dirpath) / filename
+            if (filename.startswith('.')
+                    or path.suffix.lower() not in COMPRESSIBLE_SUFFIXES):
+                continue
+            if path.stat().st_size >= MIN_SIZE:
+                yield path
+
+
+def compress_batch(tasks, formats):
+    """
+    Compress a batch of files, skipping those whose source is unchanged.
+
+    Args:
+        tasks: List of (path, recorded_digest) pairs; recorded_digest is
+            None for files not compressed before
+        formats: Sibling suffixes to produce
+
+    Returns:
+        List of (path, digest, source_size, sizes) tuples, where sizes maps
+        each sibling suffix to its size (None if not kept), or None for the
+        whole entry if the file was skipped as unchanged
+    """
+    ih = hublib.load_inject_header()
+    results = []
+    for path, recorded in tasks:
+        path = Path(path)
+        data = path.read_bytes()
+        digest = ih.content_digest(data)
+        siblings = {fmt: Path(f'{path}{fmt}') for fmt in formats}
+        if digest == recorded and all(s.exists() for s in siblings.values()):
+            results.append((str(path), digest, len(data), None))
+            continue
+
+        sizes = {}
+        for fmt, sibling in siblings.items():
+            compressed = compress(data, fmt)
+            if len(compressed) < len(data):
+                ih.write_file_atomically(sibling, compressed)
+                sizes[fmt] = len(compressed)
+            else:
+                # not worth serving; drop any sibling from an older source
+                sibling.unlink(missing_ok=True)
+                sizes[fmt] = None
+        results.append((str(path), digest, len(data), sizes))
+    return results
+
+
+def sibling_size(path, fmt):
+    """Size of an existing sibling, or None."""
+    try:
+        return os.path.getsize(f'{path}{fmt}')
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Write .gz/.br siblings for compressible files in the docs tree'
+    )
+    parser.add_argument(
+        'docs_root',
+        help='Path to the docs/ directory'
+    )
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=os.cpu_count() or 1,
+        help='Number of worker processes (default: number of CPUs)'
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Recompress every file, ignoring the manifest'
+    )
+    args = parser.parse_args()
+
+    docs_root = Path(args.docs_root)
+    if not docs_root.is_dir():
+        print(f"Error: Directory not found: {docs_root}", file=sys.stderr)
+        sys.exit(1)
+
+    formats = available_formats()
+    if brotli is None:
+        print("Warning: brotli is not installed; writing .gz siblings only",
+              file=sys.stderr)
+
+    manifest_path = docs_root / MANIFEST_FILENAME
+    try:
+        manifest = json.loads(manifest_path.read_text())
+    except (FileNotFoundError, ValueError):
+        manifest = {}
+
+    sources = list(find_sources(docs_root))
+    tasks = [
+        (str(path), None if args.force else manifest.get(path.relative_to(docs_root).as_posix()))
+        for path in sources
+    ]
+    batches = [tasks[i:i + BATCH_SIZE] for i in range(0, len(tasks), BATCH_SIZE)]
+
+    if args.jobs > 1 and len(batches) > 1:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            results = [r for batch in pool.map(compress_batch, batches,
+                                               [formats] * len(batches))
+                       for r in batch]
+    else:
+        results = [r for batch in batches for r in compress_batch(batch, formats)]
+
+    report = defaultdict(lambda: defaultdict(int))
+    new_manifest = {}
+    for path, digest, source_size, sizes in results:
+        key = Path(path).relative_to(docs_root).as_posix()
+        new_manifest[key] = digest
+        stats = report[key.split('/')[0]]
+        stats['files'] += 1
+        stats['compressed'] += sizes is not None
+        stats['source'] += source_size
+        for fmt in formats:
+            size = sizes[fmt] if sizes is not None else sibling_size(path, fmt)
+            stats[fmt] += size if size is not None else source_size
+
+    # remove siblings of sources that are gone
+    removed = 0
+    for key in set(manifest) - set(new_manifest):
+        for fmt in ('.gz', '.br'):
+            sibling = docs_root / f'{key}{fmt}'
+            if sibling.exists():
+                sibling.unlink()
+                removed += 1
+
+    if new_manifest != manifest:
+        manifest_path.write_text(json.dumps(new_manifest, indent=1, sort_keys=True) + '\n')
+
+    for project in sorted(report):
+        stats = report[project]
+        line = (f"  {project}: {stats['files']} files "
+                f"({stats['compressed']} recompressed), "
+                f"{hublib.format_bytes(stats['source'])}")
+        for fmt in formats:
+            saved = 1 - stats[fmt] / stats['source'] if stats['source'] else 0
+            line += f" -> {fmt} {hublib.format_bytes(stats[fmt])} (-{saved:.0%})"
+        print(line)
+
+    total_compressed = sum(stats['compressed'] for stats in report.values())
+    print(f"\nComplete: {total_compressed}/{len(results)} files recompressed, "
+          f"{removed} orphaned siblings removed")
+
+
+if __name__ == '__main__':
+    main()
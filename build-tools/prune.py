@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Remove Sphinx build byproducts from the published docs tree.
+
+Sphinx output copied into docs/ carries files no browser requests. Each rule
+below removes one kind of them:
+
+``doctrees``
+    ``.doctrees/`` environment directories and ``*.doctree`` files
+``pickles``
+    ``*.pickle`` files (e.g. ``environment.pickle``)
+``buildinfo``
+    ``.buildinfo`` files
+``sources``
+    ``_sources/`` copies of the page sources
+
+A file is never removed while an HTML page references it (by ``href`` or
+``src``). ``_sources/`` is also kept for sites whose JavaScript loads it,
+which older Sphinx search pages do when ``HAS_SOURCE`` is set in
+``documentation_options.js``.
+
+Usage:
+    python build-tools/prune.py docs/ --dry-run
+    python build-tools/prune.py docs/
+    python build-tools/prune.py docs/ --rules doctrees,pickles,buildinfo
+"""
+
+import argparse
+import re
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+import hublib
+
+
+# Rule name -> directory names whose contents it removes, file suffixes and
+# file names it removes
+RULES = {
+    'doctrees': {'dirs': ('.doctrees',), 'suffixes': ('.doctree',), 'names': ()},
+    'pickles': {'dirs': (), 'suffixes': ('.pickle',), 'names': ()},
+    'buildinfo': {'dirs': (), 'suffixes': (), 'names': ('.buildinfo',)},
+    'sources': {'dirs': ('_sources',), 'suffixes': (), 'names': ()},
+}
+
+HAS_SOURCE_PATTERN = re.compile(r'HAS_SOURCE:\s*true')
+
+
+def match_rule(rel_parts, rules):
+    """Name of the first rule matching a file (given as path parts), or None."""
+    name = rel_parts[-1]
+    for rule in rules:
+        spec = RULES[rule]
+        if (name in spec['names']
+                or name.endswith(spec['suffixes'] or ('\0',))
+                or any(d in rel_parts[:-1] for d in spec['dirs'])):
+            return rule
+    return None
+
+
+def find_candidates(docs_root, rules):
+    """
+    Find every file matched by a rule.
+
+    Returns:
+        Dict mapping Paths to the name of the rule matching them
+    """
+    candidates = {}
+    for path in hublib.iter_project_files(docs_root):
+        rule = match_rule(path.relative_to(docs_root).parts, rules)
+        if rule:
+            candidates[path] = rule
+    return candidates
+
+
+def find_referenced(docs_root, candidates, base_url):
+    """
+    Return the candidates an HTML page references, resolved to Paths.
+
+    Only references that could name a candidate (by containing the name of
+    one of its rule's directories or files) are resolved.
+    """
+    tokens = {part for rule in set(candidates.values())
+              for key in ('dirs', 'suffixes', 'names') for part in RULES[rule][key]}
+    referenced = set()
+    for page in hublib.iter_project_files(docs_root, {'.html'}):
+        text = page.read_text(encoding='utf-8', errors='replace')
+        for _, url in hublib.HTML_REF_PATTERN.findall(text):
+            if not any(token in url for token in tokens):
+                continue
+            target = (hublib.resolve_hub_url(url, docs_root, base_url)
+                      or hublib.resolve_local_reference(page, url))
+            if target in candidates:
+                referenced.add(target)
+    return referenced
+
+
+def sites_loading_sources(docs_root):
+    """
+    Directories of Sphinx sites whose JavaScript loads ``_sources/``.
+
+    That is the case when documentation_options.js sets HAS_SOURCE and a
+    script of the site's _static/ directory refers to _sources.
+    """
+    sites = set()
+    for options in Path(docs_root).rglob('_static/documentation_options.js'):
+        static_dir = options.parent
+        if not HAS_SOURCE_PATTERN.search(options.read_text(errors='replace')):
+            continue
+        if any('_sources' in script.read_text(errors='replace')
+               for script in static_dir.glob('*.js')):
+            sites.add(static_dir.parent)
+    return sites
+
+
+def remove_empty_parents(path, docs_root):
+    """Remove the directories above path emptied by its removal."""
+    for directory in path.parents:
+        if directory == docs_root or any(directory.iterdir()):
+            break
+        directory.rmdir()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Remove Sphinx build byproducts from the published docs tree'
+    )
+    parser.add_argument(
+        'docs_root',
+        help='Path to the docs/ directory'
+    )
+    parser.add_argument(
+        '--rules',
+        default=','.join(RULES),
+        help=f'Comma-separated rules to apply (default: {",".join(RULES)})'
+    )
+    parser.add_argument(
+        '--base-url',
+        default='https://clams.ai',
+        help='Base URL of the hub, to resolve absolute references '
+             '(default: https://clams.ai)'
+    )
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Show what would be removed without removing it'
+    )
+    args = parser.parse_args()
+
+    docs_root = Path(args.docs_root)
+    if not docs_root.is_dir():
+        print(f"Error: Directory not found: {docs_root}", file=sys.stderr)
+        sys.exit(1)
+    rules = [rule.strip() for rule in args.rules.split(',') if rule.strip()]
+    unknown = [rule for rule in rules if rule not in RULES]
+    if unknown:
+        parser.error(f"unknown rules: {', '.join(unknown)} (choose from {', '.join(RULES)})")
+
+    candidates = find_candidates(docs_root, rules)
+    keep = find_referenced(docs_root, candidates, args.base_url)
+    if 'sources' in rules:
+        for site in sites_loading_sources(docs_root):
+            keep.update(path for path, rule in candidates.items()
+                        if rule == 'sources' and site in path.parents)
+
+    if args.dry_run:
+        print("Dry run mode - no changes will be made\n")
+    report = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+    for path, rule in sorted(candidates.items()):
+        if path in keep:
+            continue
+        stats = report[hublib.project_of(path, docs_root)][rule]
+        stats[0] += 1
+        stats[1] += path.stat().st_size
+        if not args.dry_run:
+            path.unlink()
+            remove_empty_parents(path, docs_root)
+
+    total_files = total_bytes = 0
+    for project in sorted(report):
+        files = sum(n for n, _ in report[project].values())
+        size = sum(b for _, b in report[project].values())
+        detail = ', '.join(f"{rule} {n} ({hublib.format_bytes(b)})"
+                           for rule, (n, b) in sorted(report[project].items()))
+        print(f"  {project}: {files} files, {hublib.format_bytes(size)}: {detail}")
+        total_files += files
+        total_bytes += size
+
+    verb = 'would remove' if args.dry_run else 'removed'
+    print(f"\nComplete: {verb} {total_files} files ({hublib.format_bytes(total_bytes)}); "
+          f"{len(keep)} kept because they are still referenced")
+
+
+if __name__ == '__main__':
+    main()
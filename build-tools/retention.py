@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Apply a retention policy to the versions of a versioned project.
+
+Versions kept by the policy stay live under ``docs/<project>/``. Every
+other version tree is packed into ``archive/<project>/<version>.tar.xz``
+(next to docs/, so it is not published) and removed from docs/, which
+drops it from the version selector and from header injection. Archived
+versions can be restored at any time.
+
+Policies (a version is kept if any of them keeps it; ``latest`` is always
+kept):
+
+``--keep-minor``
+    the newest patch release of every major.minor series
+``--keep-last N``
+    the N newest versions
+``--keep VERSION``
+    specific versions (repeatable)
+
+Run inject-header.py afterwards to update the version selectors and the
+project's redirect.
+
+Usage:
+    python build-tools/retention.py docs/mmif-python --keep-minor --dry-run
+    python build-tools/retention.py docs/mmif-python --keep-minor --keep-last 5
+    python build-tools/retention.py docs/mmif-python --list
+    python build-tools/retention.py docs/mmif-python --restore 1.0.3
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tarfile
+import tempfile
+from pathlib import Path
+
+import hublib
+
+
+# Archive directory, relative to the parent of the docs root
+ARCHIVE_DIR = 'archive'
+
+ARCHIVE_SUFFIX = '.tar.xz'
+
+
+def select_versions(versions, keep_minor=False, keep_last=None, keep=()):
+    """
+    Decide which versions the policy keeps.
+
+    Args:
+        versions: Versions sorted newest first (as from discover_versions)
+        keep_minor: Keep the newest patch release of each major.minor
+        keep_last: Keep this many newest versions
+        keep: Versions to keep regardless
+
+    Returns:
+        Set of versions to keep
+    """
+    ih = hublib.load_inject_header()
+    kept = {'latest'} | set(keep)
+    if keep_last:
+        kept.update([v for v in versions if v != 'latest'][:keep_last])
+    if keep_minor:
+        seen = set()
+        for version in versions:
+            series = ih.parse_version(version)[:2]
+            if version != 'latest' and series not in seen:
+                seen.add(series)
+                kept.add(version)
+    return kept & set(versions)
+
+
+def archive_path(archive_root, project, version):
+    """Path of the archive of one version."""
+    return Path(archive_root) / project / f'{version}{ARCHIVE_SUFFIX}'
+
+
+def reset_owner(tarinfo):
+    """Strip local ownership from archive members."""
+    tarinfo.uid = tarinfo.gid = 0
+    tarinfo.uname = tarinfo.gname = ''
+    return tarinfo
+
+
+def archive_version(project_dir, version, archive_root):
+    """
+    Pack a version tree into its archive and remove the tree.
+
+    The archive is written to a temporary file, checked to hold every file
+    of the tree, and only then moved into place and the tree deleted.
+
+    Returns:
+        Size of the archive in bytes
+    """
+    project_dir = Path(project_dir)
+    version_dir = project_dir / version
+    target = archive_path(archive_root, project_dir.name, version)
+    target.parent.mkdir(parents=True, exist_ok=True)
+
+    files = sorted(p for p in version_dir.rglob('*'))
+    fd, tmp_path = tempfile.mkstemp(dir=target.parent, suffix='.tmp')
+    os.close(fd)
+    try:
+        with tarfile.open(tmp_path, 'w:xz', preset=9) as tar:
+            tar.add(version_dir, arcname=version, recursive=False, filter=reset_owner)
+            for path in files:
+                arcname = f'{version}/{path.relative_to(version_dir).as_posix()}'
+                tar.add(path, arcname=arcname, recursive=False, filter=reset_owner)
+        with tarfile.open(tmp_path, 'r:xz') as tar:
+            if len(tar.getmembers()) != len(files) + 1:
+                raise OSError(f"archive of {version_dir} is incomplete")
+        os.replace(tmp_path, target)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    shutil.rmtree(version_dir)
+    return target.stat().st_size
+
+
+def restore_version(project_dir, version, archive_root):
+    """Unpack an archived version back into the project directory."""
+    project_dir = Path(project_dir)
+    source = archive_path(archive_root, project_dir.name, version)
+    if not source.is_file():
+        raise ValueError(f"No archive for {project_dir.name} {version} at {source}")
+    if (project_dir / version).exists():
+        raise ValueError(f"{project_dir / version} already exists")
+
+    with tarfile.open(source, 'r:xz') as tar:
+        for member in tar.getmembers():
+            if member.name != version and not member.name.startswith(version + '/'):
+                raise ValueError(f"Unexpected member {member.name} in {source}")
+        if hasattr(tarfile, 'data_filter'):
+            tar.extractall(project_dir, filter='data')
+        else:
+            tar.extractall(project_dir)
+    source.unlink()
+
+
+def list_archived(archive_root, project):
+    """Versions of project that have an archive."""
+    directory = Path(archive_root) / project
+    if not directory.is_dir():
+        return []
+    ih = hublib.load_inject_header()
+    return sorted((p.name[:-len(ARCHIVE_SUFFIX)]
+                   for p in directory.glob(f'*{ARCHIVE_SUFFIX}')),
+                  key=ih.parse_version, reverse=True)
+
+
+def tree_size(directory):
+    """Total size in bytes of the files under directory."""
+    return sum(p.stat().st_size for p in Path(directory).rglob('*') if p.is_file())
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Archive old versions of a versioned project, or restore them'
+    )
+    parser.add_argument(
+        'project_dir',
+        help='Path to the project documentation directory (e.g., docs/mmif-python/)'
+    )
+    parser.add_argument(
+        '--keep-minor',
+        action='store_true',
+        help='Keep the newest patch release of every major.minor series'
+    )
+    parser.add_argument(
+        '--keep-last',
+        type=int,
+        metavar='N',
+        help='Keep the N newest versions'
+    )
+    parser.add_argument(
+        '--keep',
+        action='append',
+        default=[],
+        metavar='VERSION',
+        help='Keep this version regardless of the policy (repeatable)'
+    )
+    parser.add_argument(
+        '--archive-dir',
+        help=f'Archive directory (default: {ARCHIVE_DIR}/ next to the docs root)'
+    )
+    parser.add_argument(
+        '--restore',
+        action='append',
+        metavar='VERSION',
+        help='Restore an archived version (repeatable)'
+    )
+    parser.add_argument(
+        '--list',
+        action='store_true',
+        help='List live and archived versions'
+    )
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Show what would be done without making changes'
+    )
+    args = parser.parse_args()
+
+    ih = hublib.load_inject_header()
+    project_dir = Path(args.project_dir)
+    if not project_dir.is_dir():
+        print(f"Error: Directory not found: {project_dir}", file=sys.stderr)
+        sys.exit(1)
+    project = project_dir.resolve().name
+    archive_root = (Path(args.archive_dir) if args.archive_dir
+                    else project_dir.resolve().parent.parent / ARCHIVE_DIR)
+
+    if args.list:
+        print(f"Live: {', '.join(ih.discover_versions(project_dir))}")
+        print(f"Archived: {', '.join(list_archived(archive_root, project)) or '-'}")
+        return
+
+    if args.restore:
+        for version in args.restore:
+            if args.dry_run:
+                print(f"  Would restore {version}")
+                continue
+            try:
+                restore_version(project_dir, version, archive_root)
+            except (OSError, ValueError, tarfile.TarError) as e:
+                print(f"Error: {e}", file=sys.stderr)
+                sys.exit(1)
+            print(f"  Restored {version}")
+        print("\nRe-run inject-header.py to update the version selector")
+        return
+
+    if project not in ih.VERSIONED_PROJECTS:
+        print(f"Error: {project} is not a versioned project", file=sys.stderr)
+        sys.exit(1)
+    if not (args.keep_minor or args.keep_last):
+        parser.error('give a policy: --keep-minor and/or --keep-last N')
+
+    versions = ih.discover_versions(project_dir)
+    kept = select_versions(versions, args.keep_minor, args.keep_last, args.keep)
+    to_archive = [v for v in versions if v not in kept]
+    print(f"{project}: keeping {len(kept)} of {len(versions)} versions: "
+          f"{', '.join(v for v in versions if v in kept)}")
+
+    freed = 0
+    archived_bytes = 0
+    for version in to_archive:
+        size = tree_size(project_dir / version)
+        freed += size
+        if args.dry_run:
+            print(f"  Would archive {version} ({hublib.format_bytes(size)})")
+            continue
+        archive_size = archive_version(project_dir, version, archive_root)
+        archived_bytes += archive_size
+        print(f"  Archived {version}: {hublib.format_bytes(size)} -> "
+              f"{hublib.format_bytes(archive_size)}")
+
+    if args.dry_run:
+        print(f"\nComplete: would archive {len(to_archive)} versions "
+              f"({hublib.format_bytes(freed)} of live docs)")
+        return
+    print(f"\nComplete: archived {len(to_archive)} versions into {archive_root / project}, "
+          f"{hublib.format_bytes(freed)} of live docs -> "
+          f"{hublib.format_bytes(archived_bytes)} of archives")
+    if to_archive:
+        print("Re-run inject-header.py to update the version selectors")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Build a hub-wide search index from the per-project Sphinx search indexes.
+
+Every project (and every version of a versioned project) under docs/ ships
+its own ``searchindex.js``. This script parses all of them and merges them
+into one index under ``docs/assets/search/``:
+
+- ``docs.json`` lists every page once per (project, page name, title), with
+  the versions it exists in, so a page that is unchanged across 30 releases
+  is stored, and matched, once
+- ``terms-<prefix>.json`` shards map each (already stemmed) term to the
+  pages containing it, split by the first two characters of the term, so a
+  browser only fetches the shards its query needs
+
+The home search page loads ``hubsearch.js`` (from ``documentation/_static``),
+which queries this index and lists results from the whole hub.
+
+Usage:
+    python build-tools/search-index.py docs/
+"""
+
+import argparse
+import json
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+import hublib
+
+
+# Output directory, relative to the docs root
+SEARCH_DIR = 'assets/search'
+
+# Number of leading term characters that select a shard
+SHARD_PREFIX_LENGTH = 2
+
+INDEX_FORMAT_VERSION = 1
+
+
+def find_search_indexes(docs_root):
+    """
+    Find every searchindex.js of every project and version.
+
+    Returns:
+        List of (project, version, path) tuples; version is the index's
+        directory relative to the project directory ('' at the project root)
+    """
+    indexes = []
+    for path in hublib.iter_project_files(docs_root, {'.js'}):
+        if path.name != 'searchindex.js':
+            continue
+        rel_parts = path.parent.relative_to(docs_root).parts
+        indexes.append((rel_parts[0], '/'.join(rel_parts[1:]), path))
+    return indexes
+
+
+def load_search_index(path):
+    """Parse a Sphinx ``Search.setIndex({...})`` file into a dict."""
+    text = path.read_text(encoding='utf-8')
+    return json.loads(text[text.index('(') + 1:text.rindex(')')])
+
+
+def shard_name(term):
+    """File-name-safe shard key of a term (mirrored in hubsearch.js)."""
+    prefix = term[:SHARD_PREFIX_LENGTH]
+    return ''.join(c if c.isascii() and c.isalnum() else '_' for c in prefix)
+
+
+def merge_indexes(indexes, version_key):
+    """
+    Merge per-site Sphinx indexes into hub-wide documents and postings.
+
+    Args:
+        indexes: List of (project, version, path) tuples
+        version_key: Sort key for version strings
+
+    Returns:
+        Tuple of (docs, terms): docs is a list of
+        [project, docname, title, versions] entries (versions newest first);
+        terms maps each lowercased term to [page ids, title page ids]
+    """
+    doc_ids = {}
+    doc_versions = defaultdict(set)
+    terms = defaultdict(lambda: (set(), set()))
+
+    for project, version, path in indexes:
+        try:
+            index = load_search_index(path)
+        except (OSError, ValueError) as e:
+            print(f"  Warning: Skipping unreadable {path}: {e}", file=sys.stderr)
+            continue
+
+        local_ids = []
+        for docname, title in zip(index['docnames'], index['titles']):
+            key = (project, docname, title)
+            if key not in doc_ids:
+                doc_ids[key] = len(doc_ids)
+            doc_versions[key].add(version)
+            local_ids.append(doc_ids[key])
+
+        for field, slot in (('terms', 0), ('titleterms', 1)):
+            for term, postings in index.get(field, {}).items():
+                term = term.lower()
+                if not term:
+                    continue
+                if isinstance(postings, int):
+                    postings = [postings]
+                terms[term][slot].update(local_ids[i] for i in postings)
+
+    docs = [None] * len(doc_ids)
+    for key, doc_id in doc_ids.items():
+        versions = sorted(doc_versions[key], key=version_key, reverse=True)
+        docs[doc_id] = [*key, versions]
+    merged_terms = {
+        term: [sorted(postings), sorted(title_postings)]
+        for term, (postings, title_postings) in terms.items()
+    }
+    return docs, merged_terms
+
+
+def write_search_index(docs_root, docs, terms):
+    """
+    Write docs.json and the term shards, removing shards no longer needed.
+
+    Returns:
+        Tuple of (files_written, total_bytes)
+    """
+    out_dir = Path(docs_root) / SEARCH_DIR
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    shards = defaultdict(dict)
+    for term in sorted(terms):
+        shards[shard_name(term)][term] = terms[term]
+
+    outputs = {
+        'docs.json': {
+            'version': INDEX_FORMAT_VERSION,
+            'prefixLength': SHARD_PREFIX_LENGTH,
+            'docs': docs,
+            'shards': sorted(shards),
+        },
+    }
+    for name, shard in shards.items():
+        outputs[f'terms-{name}.json'] = shard
+
+    written = 0
+    total_bytes = 0
+    for filename, data in outputs.items():
+        text = json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+        total_bytes += len(text.encode('utf-8'))
+        written += hublib.write_if_changed(out_dir / filename, text)
+
+    for stale in out_dir.glob('terms-*.json'):
+        if stale.name not in outputs:
+            stale.unlink()
+    return written, total_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Merge per-project Sphinx search indexes into one sharded hub index'
+    )
+    parser.add_argument(
+        'docs_root',
+        help='Path to the docs/ directory'
+    )
+    args = parser.parse_args()
+
+    docs_root = Path(args.docs_root)
+    if not docs_root.is_dir():
+        print(f"Error: Directory not found: {docs_root}", file=sys.stderr)
+        sys.exit(1)
+
+    ih = hublib.load_inject_header()
+    indexes = find_search_indexes(docs_root)
+    print(f"Found {len(indexes)} search indexes in "
+          f"{len({project for project, _, _ in indexes})} projects")
+
+    source_bytes = sum(path.stat().st_size for _, _, path in indexes)
+    docs, terms = merge_indexes(
+        indexes, lambda v: ih.parse_version(v) if v else (0,)
+    )
+    written, total_bytes = write_search_index(docs_root, docs, terms)
+
+    print(f"  {len(docs)} distinct pages, {len(terms)} distinct terms")
+    print(f"\nComplete: {hublib.format_bytes(source_bytes)} of per-project "
+          f"indexes merged into {hublib.format_bytes(total_bytes)} "
+          f"under {docs_root / SEARCH_DIR} ({written} files updated)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Generate ``docs/sitemap.xml`` for every project and version in the hub.
+
+Every HTML page under docs/ is listed with its absolute URL (directory URLs
+for ``index.html``) and a ``<lastmod>`` date. Pages that redirect
+(``http-equiv="refresh"``), ask not to be indexed (``noindex``, e.g. Sphinx
+search pages) or only index the others (genindex, module indexes) are left
+out.
+
+``<lastmod>`` only moves when a page's content changes: the digest of every
+page, taken without the injected hub header (so header updates do not count),
+is recorded with its date in ``docs/.sitemap-manifest.json``, and a page
+keeps its recorded date while its digest is unchanged. The sitemap is only
+rewritten when an entry changed.
+
+Usage:
+    python build-tools/sitemap.py docs/
+    python build-tools/sitemap.py docs/ --base-url https://clams.ai
+"""
+
+import argparse
+import json
+import re
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+
+import hublib
+
+
+SITEMAP_FILENAME = 'sitemap.xml'
+
+MANIFEST_FILENAME = '.sitemap-manifest.json'
+
+# Pages that are not worth listing
+EXCLUDED_NAMES = {'genindex.html', 'py-modindex.html', 'search.html'}
+EXCLUDED_PAGE_PATTERN = re.compile(
+    rb'<meta[^>]*(?:http-equiv="refresh"|name="robots"[^>]*noindex)', re.IGNORECASE
+)
+
+SITEMAP_HEADER = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+                  '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+SITEMAP_FOOTER = '</urlset>\n'
+
+
+def list_pages(docs_root):
+    """
+    Find the pages to list in the sitemap.
+
+    Returns:
+        Sorted list of page Paths
+    """
+    docs_root = Path(docs_root)
+    candidates = list(hublib.iter_project_files(docs_root, {'.html'}))
+    if (docs_root / 'index.html').is_file():
+        candidates.append(docs_root / 'index.html')
+
+    pages = []
+    for path in candidates:
+        if path.name in EXCLUDED_NAMES:
+            continue
+        with open(path, 'rb') as f:
+            head = f.read().partition(b'</head>')[0]
+        if not EXCLUDED_PAGE_PATTERN.search(head):
+            pages.append(path)
+    return sorted(pages)
+
+
+def page_url(path, docs_root, base_url):
+    """Absolute URL of a page, with directory URLs for index.html."""
+    rel = Path(path).relative_to(docs_root).as_posix()
+    if rel == 'index.html' or rel.endswith('/index.html'):
+        rel = rel[:-len('index.html')]
+    return f"{base_url.rstrip('/')}/{quote(rel)}"
+
+
+def load_manifest(manifest_path):
+    """Load the page digests and dates of the previous run ({} if missing)."""
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            return json.load(f).get('pages', {})
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def update_entries(pages, docs_root, manifest, today):
+    """
+    Compute the digest and lastmod date of every page.
+
+    Args:
+        pages: Page Paths, as from list_pages
+        docs_root: Path to the docs/ directory
+        manifest: Entries of the previous run, as from load_manifest
+        today: Date (YYYY-MM-DD) for new and changed pages
+
+    Returns:
+        Tuple of (entries, changed): entries maps relative page paths to
+        ``{'digest': ..., 'lastmod': ...}``; changed counts new and changed
+        pages
+    """
+    entries = {}
+    changed = 0
+    for path in pages:
+        key = path.relative_to(docs_root).as_posix()
+        digest = hublib.published_digest(path)
+        previous = manifest.get(key)
+        if previous and previous['digest'] == digest:
+            entries[key] = previous
+        else:
+            entries[key] = {'digest': digest, 'lastmod': today}
+            changed += 1
+    return entries, changed
+
+
+def render_sitemap(entries, docs_root, base_url):
+    """Render the sitemap XML (str) for the given entries."""
+    lines = [SITEMAP_HEADER]
+    for key, entry in sorted(entries.items()):
+        url = page_url(Path(docs_root) / key, docs_root, base_url)
+        lines.append(f"  <url><loc>{escape(url)}</loc>"
+                     f"<lastmod>{entry['lastmod']}</lastmod></url>\n")
+    lines.append(SITEMAP_FOOTER)
+    return ''.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Generate sitemap.xml for every project and version in the hub'
+    )
+    parser.add_argument(
+        'docs_root',
+        help='Path to the docs/ directory'
+    )
+    parser.add_argument(
+        '--base-url',
+        default='https://clams.ai',
+        help='Base URL the hub is served from (default: https://clams.ai)'
+    )
+    args = parser.parse_args()
+
+    docs_root = Path(args.docs_root)
+    if not docs_root.is_dir():
+        print(f"Error: Directory not found: {docs_root}", file=sys.stderr)
+        sys.exit(1)
+
+    manifest_path = docs_root / MANIFEST_FILENAME
+    manifest = load_manifest(manifest_path)
+    today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+
+    pages = list_pages(docs_root)
+    entries, changed = update_entries(pages, docs_root, manifest, today)
+    removed = len(set(manifest) - set(entries))
+
+    hublib.write_if_changed(docs_root / SITEMAP_FILENAME,
+                     render_sitemap(entries, docs_root, args.base_url))
+    hublib.write_if_changed(manifest_path,
+                     json.dumps({'pages': entries}, indent=1, sort_keys=True) + '\n')
+
+    print(f"\nComplete: {len(entries)} pages in {docs_root / SITEMAP_FILENAME} "
+          f"({changed} new or changed, {removed} removed)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Sync a freshly built documentation tree into its place in the hub.
+
+Replaces ``rm -rf DEST/* && cp -r SRC/* DEST/``: files are compared by
+content hash and only new or changed files are copied; files no longer in
+the build are deleted. Unchanged files are left alone, keeping their mtime,
+so git does not need to re-read them and they do not show up in the diff.
+
+Published files are rewritten by the rest of the publish pipeline (header
+injection, fingerprinting, minifying, image optimization), so they are not
+compared with the build directly: the digest of every built file is
+recorded in ``DEST/.sync-manifest.json``, and a file is unchanged when its
+digest matches the recorded one and its published copy still exists. Copies
+the pipeline renamed or removed (fingerprinted or pruned files) are copied
+again, as changed pages copied in by the same sync refer to them by their
+built names; the pipeline then derives the same files from them again. Without a manifest (the first sync into
+DEST), files are compared with their published copies, ignoring the
+injected header of HTML pages. A file that changed is copied as built, and
+the pipeline rewrites it again.
+
+Files the pipeline derived from a built file are kept while that file is
+still in the build, and removed with it: fingerprinted names
+(``furo.621cb56662.js``), WebP variants of PNGs and ``.gz``/``.br``
+siblings.
+
+Like the shell glob it replaces, top-level entries of SRC and DEST whose
+names start with a dot are ignored.
+
+Usage:
+    python build-tools/sync-tree.py clone-repo/_docs docs/mmif-python/1.5.3
+    python build-tools/sync-tree.py _docs docs/clams-python --dry-run
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+from pathlib import Path
+
+import hublib
+
+
+MANIFEST_FILENAME = '.sync-manifest.json'
+MANIFEST_FORMAT_VERSION = 1
+
+# Names of files derived from a built file by later publish steps: content
+# hashes from fingerprint.py, and siblings from optimize-images.py and
+# precompress.py
+FINGERPRINTED_PATTERN = re.compile(r'^(.*)\.[0-9a-f]{8,}(\.[^./]+)$')
+WEBP_SOURCE_SUFFIX = {'.webp': '.png'}
+PRECOMPRESSED_SUFFIXES = ('.gz', '.br')
+
+
+def list_files(root):
+    """
+    List the files under root, skipping top-level hidden entries.
+
+    Returns:
+        Set of POSIX paths relative to root
+    """
+    files = set()
+    if not root.is_dir():
+        return files
+    for dirpath, dirnames, filenames in os.walk(root):
+        if Path(dirpath) == root:
+            dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+            filenames = [f for f in filenames if not f.startswith('.')]
+        for filename in filenames:
+            path = Path(dirpath) / filename
+            files.add(path.relative_to(root).as_posix())
+    return files
+
+
+def load_manifest(manifest_path):
+    """
+    Load the digests recorded by the last sync.
+
+    Returns:
+        Dict mapping relative paths to the SHA-256 of the built file, or None
+        if missing or unreadable
+    """
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if data.get('version') != MANIFEST_FORMAT_VERSION:
+        return None
+    return data.get('files', {})
+
+
+def save_manifest(manifest_path, files):
+    """Write the recorded digests with entries sorted for stable diffs."""
+    data = {
+        'version': MANIFEST_FORMAT_VERSION,
+        'files': {key: files[key] for key in sorted(files)},
+    }
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=1)
+        f.write('\n')
+
+
+def derived_from(rel_path):
+    """
+    Relative paths of the built files a published file may derive from.
+
+    E.g. ``_static/furo.621cb56662.js.br`` -> ``_static/furo.621cb56662.js``,
+    ``_static/furo.js``.
+    """
+    candidates = []
+    for suffix in PRECOMPRESSED_SUFFIXES:
+        if rel_path.endswith(suffix):
+            rel_path = rel_path[:-len(suffix)]
+            candidates.append(rel_path)
+            break
+    match = FINGERPRINTED_PATTERN.match(rel_path)
+    if match:
+        rel_path = match.group(1) + match.group(2)
+        candidates.append(rel_path)
+    path = Path(rel_path)
+    if path.suffix in WEBP_SOURCE_SUFFIX:
+        candidates.append(path.with_suffix(WEBP_SOURCE_SUFFIX[path.suffix]).as_posix())
+    return candidates
+
+
+def copy_file(src, dest):
+    """Copy src over dest via a temporary file, keeping src's permission bits."""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    if dest.is_dir():
+        shutil.rmtree(dest)
+    tmp_dest = dest.with_name(f'.{dest.name}.sync-tmp')
+    shutil.copyfile(src, tmp_dest)
+    shutil.copymode(src, tmp_dest)
+    os.replace(tmp_dest, dest)
+
+
+def remove_empty_dirs(root):
+    """Remove directories under root left empty by deletions."""
+    for dirpath, _, _ in sorted(os.walk(root), key=lambda d: -len(d[0])):
+        if Path(dirpath) != root and not os.listdir(dirpath):
+            os.rmdir(dirpath)
+
+
+def sync_tree(src_root, dest_root, dry_run=False):
+    """
+    Make dest_root mirror src_root, touching only files that differ.
+
+    Files are compared with the digests recorded by the last sync, or with
+    their published copies if there are none (see the module docstring).
+    Files derived from a file of the build are kept.
+
+    Returns:
+        Dict mapping 'added', 'updated', 'removed' and 'unchanged' to lists
+        of relative paths, and 'bytes_copied' to the number of bytes copied
+    """
+    src_files = list_files(src_root)
+    dest_files = list_files(dest_root)
+    manifest_path = dest_root / MANIFEST_FILENAME
+    recorded = load_manifest(manifest_path)
+    digests = {}
+    result = {'added': [], 'updated': [], 'removed': [], 'unchanged': [],
+              'bytes_copied': 0}
+
+    # delete first, so files never block directories of the new tree
+    for rel_path in sorted(dest_files - src_files):
+        if any(base in src_files for base in derived_from(rel_path)):
+            continue
+        result['removed'].append(rel_path)
+        if not dry_run:
+            (dest_root / rel_path).unlink()
+    if not dry_run and dest_root.is_dir():
+        remove_empty_dirs(dest_root)
+
+    for rel_path in sorted(src_files):
+        src = src_root / rel_path
+        dest = dest_root / rel_path
+        digests[rel_path] = hublib.file_digest(src)
+        if recorded is not None:
+            if rel_path not in recorded or rel_path not in dest_files:
+                # a copy renamed or pruned since is copied again, so pages
+                # copied in by this sync find the names they reference
+                status = 'added'
+            elif recorded[rel_path] == digests[rel_path]:
+                status = 'unchanged'
+            else:
+                status = 'updated'
+        elif rel_path in dest_files:
+            # sizes differ for every injected page, so always hash
+            same_size = src.stat().st_size == dest.stat().st_size
+            if src.suffix != '.html' and not same_size:
+                status = 'updated'
+            elif digests[rel_path] == hublib.published_digest(dest):
+                status = 'unchanged'
+            else:
+                status = 'updated'
+        else:
+            status = 'added'
+        result[status].append(rel_path)
+        if status != 'unchanged':
+            result['bytes_copied'] += src.stat().st_size
+            if not dry_run:
+                copy_file(src, dest)
+    if not dry_run and digests != recorded:
+        save_manifest(manifest_path, digests)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Sync a built documentation tree into the hub, copying only changed files'
+    )
+    parser.add_argument(
+        'src',
+        help='Freshly built documentation directory'
+    )
+    parser.add_argument(
+        'dest',
+        help='Published directory in the hub (e.g., docs/mmif-python/1.5.3)'
+    )
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Show what would be done without making changes'
+    )
+    args = parser.parse_args()
+
+    src_root = Path(args.src)
+    dest_root = Path(args.dest)
+    if not src_root.is_dir():
+        print(f"Error: Directory not found: {src_root}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.dry_run:
+        print("Dry run mode - no changes will be made\n")
+    result = sync_tree(src_root, dest_root, dry_run=args.dry_run)
+
+    for status in ('added', 'updated', 'removed'):
+        for rel_path in result[status]:
+            print(f"  {status}: {rel_path}")
+    print(f"\nComplete: {len(result['added'])} added, {len(result['updated'])} updated, "
+          f"{len(result['removed'])} removed, {len(result['unchanged'])} unchanged "
+          f"({hublib.format_bytes(result['bytes_copied'])} copied into {dest_root})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+/*
+ * Hub-wide search for the CLAMS documentation hub home pages.
+ *
+ * On the search page, queries the merged index written by
+ * build-tools/search-index.py under <hub root>/assets/search/ and lists
+ * matching pages from every project above the regular results. Only the
+ * term shards needed by the query are fetched.
+ */
+(function () {
+    "use strict";
+
+    function shardName(term, prefixLength) {
+        return term.slice(0, prefixLength).replace(/[^a-z0-9]/gi, "_");
+    }
+
+    function queryTerms(query) {
+        var stemmer = typeof Stemmer === "function" ? new Stemmer() : null;
+        var stop = typeof stopwords !== "undefined" ? stopwords : new Set();
+        var seen = {};
+        return query.toLowerCase().split(/[^\p{L}\p{N}_]+/u).filter(function (word) {
+            return word && !(stop.has ? stop.has(word) : stop.indexOf(word) >= 0);
+        }).map(function (word) {
+            return stemmer ? stemmer.stemWord(word) : word;
+        }).filter(function (term) {
+            if (seen[term]) { return false; }
+            seen[term] = true;
+            return true;
+        });
+    }
+
+    function fetchJSON(url) {
+        return fetch(url).then(function (response) {
+            if (!response.ok) { throw new Error(url + ": " + response.status); }
+            return response.json();
+        });
+    }
+
+    function pageURL(hubRoot, doc, version) {
+        return hubRoot + doc[0] + "/" + (version ? version + "/" : "") + doc[1] + ".html";
+    }
+
+    function render(container, hubRoot, docs, ranked) {
+        var heading = document.createElement("h2");
+        heading.textContent = "Results across the CLAMS hub";
+        container.appendChild(heading);
+
+        var summary = document.createElement("p");
+        summary.textContent = ranked.length
+            ? "Found " + ranked.length + " page(s) across all projects."
+            : "No pages across the hub matched your search.";
+        container.appendChild(summary);
+
+        var list = document.createElement("ul");
+        list.className = "search";
+        ranked.forEach(function (hit) {
+            var doc = docs[hit.id];
+            var versions = doc[3];
+            var item = document.createElement("li");
+            var link = document.createElement("a");
+            link.href = pageURL(hubRoot, doc, versions[0]);
+            link.textContent = doc[2];
+            item.appendChild(link);
+            var context = doc[0] + (versions[0] ? " " + versions[0] : "");
+            if (versions.length > 1) {
+                context += " (also in " + (versions.length - 1) + " older version(s))";
+            }
+            item.appendChild(document.createTextNode(" — " + context));
+            list.appendChild(item);
+        });
+        container.appendChild(list);
+    }
+
+    function search(query, container) {
+        var contentRoot = document.documentElement.dataset.content_root || "./";
+        var hubRoot = contentRoot + "../";
+        var indexRoot = hubRoot + "assets/search/";
+        var terms = queryTerms(query);
+        if (!terms.length) { return; }
+
+        fetchJSON(indexRoot + "docs.json").then(function (meta) {
+            var available = new Set(meta.shards);
+            var shards = {};
+            terms.forEach(function (term) {
+                var name = shardName(term, meta.prefixLength);
+                if (available.has(name)) { shards[name] = true; }
+            });
+            return Promise.all(Object.keys(shards).map(function (name) {
+                return fetchJSON(indexRoot + "terms-" + name + ".json");
+            })).then(function (loaded) {
+                var postings = Object.assign.apply(Object, [{}].concat(loaded));
+                var scores = null;
+                terms.forEach(function (term) {
+                    var entry = postings[term] || [[], []];
+                    var termScores = {};
+                    entry[0].forEach(function (id) { termScores[id] = 5; });
+                    entry[1].forEach(function (id) { termScores[id] = (termScores[id] || 0) + 15; });
+                    if (scores === null) {
+                        scores = termScores;
+                        return;
+                    }
+                    // every query term must match, as in Sphinx's own search
+                    Object.keys(scores).forEach(function (id) {
+                        if (id in termScores) { scores[id] += termScores[id]; }
+                        else { delete scores[id]; }
+                    });
+                });
+                var ranked = Object.keys(scores || {}).map(function (id) {
+                    return { id: Number(id), score: scores[id] };
+                }).sort(function (a, b) {
+                    return b.score - a.score || a.id - b.id;
+                });
+                render(container, hubRoot, meta.docs, ranked);
+            });
+        }).catch(function (error) {
+            console.warn("CLAMS hub search unavailable:", error);
+        });
+    }
+
+    document.addEventListener("DOMContentLoaded", function () {
+        var results = document.getElementById("search-results");
+        var query = new URLSearchParams(window.location.search).get("q");
+        if (!results || !query) { return; }
+        var container = document.createElement("section");
+        container.id = "hub-search-results";
+        results.parentNode.insertBefore(container, results);
+        search(query, container);
+    });
+})();
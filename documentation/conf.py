@@ -1,6 +1,7 @@
 # Configuration file for the Sphinx documentation builder.
 # CLAMS Project Documentation Hub
 
+import json
 import os
 import sys
 
@@ -66,16 +67,43 @@ html_title = "CLAMS Project"
 # so a file named "default.css" will overwrite the builtin "default.css".
 html_static_path = ['_static']
 
+# Hub-wide search on the search page, backed by the merged index that
+# build-tools/search-index.py writes to docs/assets/search/
+html_js_files = ['hubsearch.js']
+
 # Don't include .rst sources in build
 html_copy_source = False
 
 # -- Extension configuration -------------------------------------------------
 
+# Local inventories of the hub's own projects, merged by
+# build-tools/inventory.py from the published objects.inv files. When present,
+# intersphinx reads them instead of fetching them over the network.
+HUB_URL = 'https://clams.ai/'
+HUB_INVENTORY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 '..', 'docs', 'assets', 'inventory')
+try:
+    with open(os.path.join(HUB_INVENTORY_DIR, 'index.json')) as f:
+        hub_inventories = json.load(f)['projects']
+except (OSError, ValueError, KeyError):
+    hub_inventories = {}
+
+
+def hub_intersphinx(project, target):
+    """Intersphinx entry for a hub project, using its local inventory if any."""
+    local = hub_inventories.get(project)
+    if local is None:
+        return (target, None)
+    # fall back to fetching objects.inv from the target if the file is gone
+    return (HUB_URL + local['target'],
+            (os.path.join(HUB_INVENTORY_DIR, local['inventory']), None))
+
+
 # Intersphinx mapping - links to other documentation
 intersphinx_mapping = {
     'python': ('https://docs.python.org/3', None),
-    'mmif-python': ('https://clams.ai/mmif-python/latest/', None),
-    'clams-python': ('https://clams.ai/clams-python/latest/', None),
+    'mmif-python': hub_intersphinx('mmif-python', 'https://clams.ai/mmif-python/latest/'),
+    'clams-python': hub_intersphinx('clams-python', 'https://clams.ai/clams-python/latest/'),
 }
 
 # Napoleon settings (for docstring parsing)